@@ -5,8 +5,9 @@ from typing import Dict, List, Tuple
 from helper_01 import HashiwokakeroGame
 
 class AStarNode:
-    def __init__(self, state: Dict, g: float, h: float):
+    def __init__(self, state: Dict, degree: List[int], g: float, h: float):
         self.state = state 
+        self.degree = degree
         self.g = g
         self.h = h
         self.f = g + h
@@ -19,15 +20,18 @@ class AStarNode:
 class AStarSolver:
     def __init__(self, game: HashiwokakeroGame):
         self.game = game
-        self.islands_map = {(r,c): v for r,c,v in game.islands}
-        self.neighbors_map = {pos: game.get_neighbors(*pos) for pos in self.islands_map}
+        self.graph = game.graph
+        self.values = self.graph.island_values.tolist()
+        self.incident = self.graph.incident()
+        self.conflicts = self.graph.conflicts()
         self.nodes_explored = 0
 
     def solve(self):
         print("Solving with A*...")
         start = time.perf_counter()
         
-        initial = AStarNode({}, 0, self._heuristic({}))
+        degree = [0] * len(self.values)
+        initial = AStarNode({}, degree, 0, self._heuristic({}, degree))
         pq = [initial]
         visited = set()
         
@@ -36,7 +40,7 @@ class AStarSolver:
             self.nodes_explored += 1
             
             if self.nodes_explored % 5000 == 0:
-                if self._detect_unsat_early(node.state):
+                if self._detect_unsat_early(node.state, node.degree):
                     elapsed = time.perf_counter() - start
                     print(f"   Detected UNSAT early at {self.nodes_explored:,} nodes")
                     print(f" No solution (UNSAT detected). Nodes: {self.nodes_explored:,}")
@@ -51,11 +55,11 @@ class AStarSolver:
                 break
             
             # Check complete FIRST, then connectivity
-            if self._is_complete(node.state):
+            if self._is_complete(node.degree):
                 if self._is_connected(node.state):
                     elapsed = time.perf_counter() - start
                     print(f"✓ Solution found! Nodes: {self.nodes_explored:,}")
-                    return node.state, elapsed
+                    return self.graph.to_solution(node.state), elapsed
                 # Complete but not connected - skip
                 continue
             
@@ -66,96 +70,82 @@ class AStarSolver:
             visited.add(state_key)
             
             # Early pruning
-            if not self._is_valid_partial(node.state):
+            if not self._is_valid_partial(node.state, node.degree):
                 continue
             
             # Select island (MRV)
-            target = self._select_island(node.state)
-            if not target:
+            target = self._select_island(node.state, node.degree)
+            if target is None:
                 continue
             
-            r, c = target
-            
             # Try connecting to neighbors
-            for nr, nc in self.neighbors_map[(r,c)]:
-                key = tuple(sorted(((r,c), (nr,nc))))
-                flat_key = (key[0][0], key[0][1], key[1][0], key[1][1])
-                
-                curr_b = node.state.get(flat_key, 0)
+            for edge, nbr in self.incident[target]:
+                curr_b = node.state.get(edge, 0)
                 
                 if curr_b >= 2:
                     continue
                 
-                n_needed = self.islands_map[(nr,nc)] - self._current_bridges(nr, nc, node.state)
+                n_needed = self.values[nbr] - node.degree[nbr]
                 if n_needed <= 0:
                     continue
                 
-                if curr_b == 0 and self._is_crossing(flat_key, node.state):
+                if curr_b == 0 and self._is_crossing(edge, node.state):
                     continue
                 
                 new_state = node.state.copy()
-                new_state[flat_key] = curr_b + 1
+                new_state[edge] = curr_b + 1
+                new_degree = node.degree.copy()
+                new_degree[target] += 1
+                new_degree[nbr] += 1
                 
-                h = self._heuristic(new_state)
+                h = self._heuristic(new_state, new_degree)
                 if h < float('inf'):
-                    heapq.heappush(pq, AStarNode(new_state, node.g + 1, h))
+                    heapq.heappush(pq, AStarNode(new_state, new_degree, node.g + 1, h))
         
         elapsed = time.perf_counter() - start
         print(f" No solution. Nodes: {self.nodes_explored:,}")
         return None, elapsed
 
-    def _is_complete(self, state):
-        for (r,c), val in self.islands_map.items():
-            if self._current_bridges(r, c, state) != val:
-                return False
-        return True
+    def _is_complete(self, degree):
+        return degree == self.values
 
-    def _is_valid_partial(self, state):
-        for (r,c), val in self.islands_map.items():
-            curr = self._current_bridges(r, c, state)
+    def _is_valid_partial(self, state, degree):
+        for island, val in enumerate(self.values):
+            curr = degree[island]
             if curr > val:
                 return False
             
             needed = val - curr
             if needed > 0:
                 max_possible = 0
-                for nr, nc in self.neighbors_map[(r,c)]:
-                    key = tuple(sorted(((r,c), (nr,nc))))
-                    flat_key = (key[0][0], key[0][1], key[1][0], key[1][1])
-                    curr_b = state.get(flat_key, 0)
-                    can_add = 2 - curr_b
-                    
-                    neighbor_curr = self._current_bridges(nr, nc, state)
-                    neighbor_can = self.islands_map[(nr,nc)] - neighbor_curr
-                    
+                for edge, nbr in self.incident[island]:
+                    can_add = 2 - state.get(edge, 0)
+                    neighbor_can = self.values[nbr] - degree[nbr]
                     max_possible += min(can_add, neighbor_can)
                 
                 if max_possible < needed:
                     return False
         return True
 
-    def _select_island(self, state):
+    def _select_island(self, state, degree):
         best = None
         best_score = -1
         
-        for (r,c), val in self.islands_map.items():
-            curr = self._current_bridges(r, c, state)
-            needed = val - curr
+        for island, val in enumerate(self.values):
+            needed = val - degree[island]
             
             if needed <= 0:
                 continue
             
             available = 0
-            for nr, nc in self.neighbors_map[(r,c)]:
-                key = tuple(sorted(((r,c), (nr,nc))))
-                flat_key = (key[0][0], key[0][1], key[1][0], key[1][1])
-                curr_b = state.get(flat_key, 0)
+            for edge, nbr in self.incident[island]:
+                curr_b = state.get(edge, 0)
                 
                 if curr_b < 2:
-                    n_needed = self.islands_map[(nr,nc)] - self._current_bridges(nr, nc, state)
+                    n_needed = self.values[nbr] - degree[nbr]
                     if n_needed > 0:
                         if curr_b == 0:
-                            if not self._is_crossing(flat_key, state):
+                            if not self._is_crossing(edge, state):
                                 available += 1
                         else:
                             available += 1
@@ -164,24 +154,17 @@ class AStarSolver:
                 score = needed / available
                 if score > best_score:
                     best_score = score
-                    best = (r,c)
+                    best = island
         
         return best
 
-    def _current_bridges(self, r, c, state):
-        count = 0
-        for (r1,c1,r2,c2), k in state.items():
-            if (r1==r and c1==c) or (r2==r and c2==c):
-                count += k
-        return count
-
-    def _heuristic(self, state):
+    def _heuristic(self, state, degree):
         total_deficit = 0
         isolated_count = 0
         
         # Phase 1: Basic deficit
-        for (r,c), val in self.islands_map.items():
-            curr = self._current_bridges(r, c, state)
+        for island, val in enumerate(self.values):
+            curr = degree[island]
             deficit = val - curr
             
             if curr > val:
@@ -206,24 +189,20 @@ class AStarSolver:
         
         # Phase 4: Hard islands
         hard_islands = 0
-        for (r,c), val in self.islands_map.items():
-            curr = self._current_bridges(r, c, state)
-            remaining = val - curr
+        for island, val in enumerate(self.values):
+            remaining = val - degree[island]
             
             if remaining > 0:
                 available = 0
-                for nr, nc in self.neighbors_map[(r,c)]:
-                    key = tuple(sorted(((r,c), (nr,nc))))
-                    flat_key = (key[0][0], key[0][1], key[1][0], key[1][1])
-                    curr_b = state.get(flat_key, 0)
+                for edge, nbr in self.incident[island]:
+                    curr_b = state.get(edge, 0)
                     
                     if curr_b < 2:
-                        neighbor_curr = self._current_bridges(nr, nc, state)
-                        neighbor_remaining = self.islands_map[(nr,nc)] - neighbor_curr
+                        neighbor_remaining = self.values[nbr] - degree[nbr]
                         
                         if neighbor_remaining > 0:
                             if curr_b == 0:
-                                if not self._is_crossing(flat_key, state):
+                                if not self._is_crossing(edge, state):
                                     available += 1
                             else:
                                 available += 1
@@ -240,69 +219,33 @@ class AStarSolver:
 
     def _count_components(self, state):
         if not state:
-            return len(self.islands_map)
-        
-        graph = {(r, c): [] for r, c, _ in self.game.islands}
-        
-        for (r1, c1, r2, c2), num_bridges in state.items():
-            if num_bridges > 0:
-                graph[(r1, c1)].append((r2, c2))
-                graph[(r2, c2)].append((r1, c1))
-        
-        visited = set()
-        components = 0
-        
-        for island in graph.keys():
-            if island not in visited:
-                components += 1
-                stack = [island]
-                
-                while stack:
-                    node = stack.pop()
-                    if node in visited:
-                        continue
-                    visited.add(node)
-                    
-                    for neighbor in graph[node]:
-                        if neighbor not in visited:
-                            stack.append(neighbor)
-        
-        return components
+            return len(self.values)
+        return len(set(self.graph.components(e for e, k in state.items() if k > 0)))
 
-    def _detect_unsat_early(self, state):
+    def _detect_unsat_early(self, state, degree):
         # Check 1: Impossible capacity
-        for (r,c), val in self.islands_map.items():
-            curr = self._current_bridges(r, c, state)
-            remaining = val - curr
+        for island, val in enumerate(self.values):
+            remaining = val - degree[island]
             
             if remaining > 0:
                 max_possible = 0
-                for nr, nc in self.neighbors_map[(r,c)]:
-                    key = tuple(sorted(((r,c), (nr,nc))))
-                    flat_key = (key[0][0], key[0][1], key[1][0], key[1][1])
-                    curr_b = state.get(flat_key, 0)
-                    can_add = 2 - curr_b
-                    
-                    neighbor_curr = self._current_bridges(nr, nc, state)
-                    neighbor_remaining = self.islands_map[(nr,nc)] - neighbor_curr
-                    
+                for edge, nbr in self.incident[island]:
+                    can_add = 2 - state.get(edge, 0)
+                    neighbor_remaining = self.values[nbr] - degree[nbr]
                     max_possible += min(can_add, neighbor_remaining)
                 
                 if max_possible < remaining:
                     return True
         
         # Check 2: Too many isolated islands
-        unconnected = self._count_unconnected_islands(state)
-        if unconnected > len(self.islands_map) * 0.7:
+        unconnected = degree.count(0)
+        if unconnected > len(self.values) * 0.7:
             possible_new = 0
-            for (r,c) in self.islands_map.keys():
-                curr = self._current_bridges(r, c, state)
-                if curr == 0:
-                    for nr, nc in self.neighbors_map[(r,c)]:
-                        key = tuple(sorted(((r,c), (nr,nc))))
-                        flat_key = (key[0][0], key[0][1], key[1][0], key[1][1])
-                        if flat_key not in state:
-                            if not self._is_crossing(flat_key, state):
+            for island in range(len(self.values)):
+                if degree[island] == 0:
+                    for edge, _ in self.incident[island]:
+                        if edge not in state:
+                            if not self._is_crossing(edge, state):
                                 possible_new += 1
                                 break
             
@@ -311,51 +254,11 @@ class AStarSolver:
         
         return False
 
-    def _count_unconnected_islands(self, state):
-        count = 0
-        for (r,c) in self.islands_map.keys():
-            if self._current_bridges(r, c, state) == 0:
-                count += 1
-        return count
-
     def _is_crossing(self, new_link, state):
-        r1a, c1a, r2a, c2a = new_link
-        h1 = r1a == r2a
-        for (r1b, c1b, r2b, c2b), _ in state.items():
-            h2 = r1b == r2b
-            if h1 == h2:
-                continue
-            if h1:
-                if min(c1a,c2a) < c1b < max(c1a,c2a) and min(r1b,r2b) < r1a < max(r1b,r2b):
-                    return True
-            else:
-                if min(c1b,c2b) < c1a < max(c1b,c2b) and min(r1a,r2a) < r1b < max(r1a,r2a):
-                    return True
+        for edge in self.conflicts[new_link]:
+            if edge in state:
+                return True
         return False
 
     def _is_connected(self, state):
-        if not self.game.islands:
-            return True
-        
-        graph = {(r, c): [] for r, c, _ in self.game.islands}
-        
-        for (r1, c1, r2, c2), num_bridges in state.items():
-            if num_bridges > 0:
-                graph[(r1, c1)].append((r2, c2))
-                graph[(r2, c2)].append((r1, c1))
-        
-        start = (self.game.islands[0][0], self.game.islands[0][1])
-        visited = set()
-        stack = [start]
-        
-        while stack:
-            node = stack.pop()
-            if node in visited:
-                continue
-            visited.add(node)
-            
-            for neighbor in graph[node]:
-                if neighbor not in visited:
-                    stack.append(neighbor)
-        
-        return len(visited) == len(self.game.islands)
\ No newline at end of file
+        return self.graph.is_connected(e for e, k in state.items() if k > 0)
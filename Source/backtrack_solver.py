@@ -8,19 +8,13 @@ sys.setrecursionlimit(10000)
 class BacktrackingSolver:
     def __init__(self, game: HashiwokakeroGame):
         self.game = game
-        self.islands_map = {(r,c): v for r,c,v in game.islands}
-        self.neighbors_map = {(r,c): game.get_neighbors(r,c) for r,c,v in game.islands}
+        self.graph = game.graph
+        self.values = self.graph.island_values.tolist()
+        self.incident = self.graph.incident()
+        self.conflicts = self.graph.conflicts()
+        self.degree = [0] * self.graph.num_islands
         self.nodes_explored = 0
         self.unsat_detected = False
-        
-        self.connections = []
-        seen = set()
-        for (r,c), neighbors in self.neighbors_map.items():
-            for nr, nc in neighbors:
-                key = self._normalize_key(r, c, nr, nc)
-                if key not in seen:
-                    self.connections.append(key)
-                    seen.add(key)
 
     def solve(self) -> Tuple[Dict, float]:
         print("Solving with Backtracking...")
@@ -32,7 +26,7 @@ class BacktrackingSolver:
         elapsed = time.perf_counter() - start
         if result:
             print(f" Solution found! Nodes: {self.nodes_explored:,}")
-            return result, elapsed
+            return self.graph.to_solution(result), elapsed
         else:
             if self.unsat_detected:
                 print(f" No solution (UNSAT detected). Nodes: {self.nodes_explored:,}")
@@ -71,25 +65,23 @@ class BacktrackingSolver:
         
         # Select MRV island
         island = self._select_mrv_island(solution)
-        if not island:
+        if island is None:
             return None
         
-        r, c = island
-        needed = self.islands_map[(r,c)] - self._current_bridges(r, c, solution)
+        needed = self.values[island] - self.degree[island]
         
         if needed <= 0:
             return self._backtrack(solution, depth + 1)
         
         # Order neighbors by LCV
-        neighbors = self._order_neighbors_lcv(r, c, solution)
+        neighbors = self._order_neighbors_lcv(island, solution)
         
         # Try connecting to each neighbor
-        for nr, nc in neighbors:
-            key = self._normalize_key(r, c, nr, nc)
-            curr_bridges = solution.get(key, 0)
+        for edge, nbr in neighbors:
+            curr_bridges = solution.get(edge, 0)
             
             # Skip if crossing
-            if curr_bridges == 0 and self._would_cross(key, solution):
+            if curr_bridges == 0 and self._would_cross(edge, solution):
                 continue
             
             # Skip if max
@@ -97,7 +89,7 @@ class BacktrackingSolver:
                 continue
             
             # Check neighbor capacity
-            neighbor_needed = self.islands_map[(nr,nc)] - self._current_bridges(nr, nc, solution)
+            neighbor_needed = self.values[nbr] - self.degree[nbr]
             if neighbor_needed <= 0:
                 continue
             
@@ -111,7 +103,9 @@ class BacktrackingSolver:
                 
                 # Add bridges
                 old_value = curr_bridges
-                solution[key] = curr_bridges + num_bridges
+                solution[edge] = curr_bridges + num_bridges
+                self.degree[island] += num_bridges
+                self.degree[nbr] += num_bridges
                 
                 # Recursive call
                 result = self._backtrack(solution, depth + 1)
@@ -119,41 +113,109 @@ class BacktrackingSolver:
                     return result
                 
                 # Backtrack
+                self.degree[island] -= num_bridges
+                self.degree[nbr] -= num_bridges
                 if old_value == 0:
-                    del solution[key]
+                    del solution[edge]
                 else:
-                    solution[key] = old_value
+                    solution[edge] = old_value
         
         return None
 
+    def forced_bridges(self) -> Dict[int, int]:
+        """
+        Lower bounds on bridges that every solution has, {edge id: count}.
+        Repeats until nothing changes: an edge must take whatever its island
+        still needs beyond what its other usable edges can hold.
+        """
+        solution = {}
+        self.degree = [0] * self.graph.num_islands
+        changed = True
+        while changed:
+            changed = False
+            for island, val in enumerate(self.values):
+                remaining = val - self.degree[island]
+                if remaining <= 0:
+                    continue
+                caps = [(edge, nbr, self._capacity(edge, nbr, solution))
+                        for edge, nbr in self.incident[island]]
+                total = sum(cap for _, _, cap in caps)
+                if total < remaining:
+                    # UNSAT; the bounds so far are all we get
+                    changed = False
+                    break
+                for edge, nbr, cap in caps:
+                    add = remaining - (total - cap)
+                    if add > 0:
+                        solution[edge] = solution.get(edge, 0) + add
+                        self.degree[island] += add
+                        self.degree[nbr] += add
+                        changed = True
+        self.degree = [0] * self.graph.num_islands
+        return solution
+
+    def greedy_assignment(self, solution: Dict[int, int] = None) -> Dict[int, int]:
+        """
+        One descent with the MRV/LCV choices of the search and no
+        backtracking, from `solution` (e.g. the forced bridges); stops at
+        the first dead end. Returns the (maybe partial) {edge id: count}.
+        """
+        solution = dict(solution or {})
+        self.degree = [0] * self.graph.num_islands
+        endpoints = self.graph.endpoints()
+        for edge, count in solution.items():
+            for island in endpoints[edge]:
+                self.degree[island] += count
+        while not self._is_complete(solution):
+            island = self._select_mrv_island(solution)
+            if island is None:
+                break
+            needed = self.values[island] - self.degree[island]
+            for edge, nbr in self._order_neighbors_lcv(island, solution):
+                curr = solution.get(edge, 0)
+                if curr == 0 and self._would_cross(edge, solution):
+                    continue
+                # 2 bridges first, as in the search
+                add = min(2 - curr, needed, self.values[nbr] - self.degree[nbr])
+                if add > 0:
+                    solution[edge] = curr + add
+                    self.degree[island] += add
+                    self.degree[nbr] += add
+                    break
+            else:
+                break
+        self.degree = [0] * self.graph.num_islands
+        return solution
+
+    def _capacity(self, edge, nbr, solution):
+        """Bridges an edge can still take: 0 if it would cross a placed bridge."""
+        curr = solution.get(edge, 0)
+        if curr == 0 and self._would_cross(edge, solution):
+            return 0
+        return max(0, min(2 - curr, self.values[nbr] - self.degree[nbr]))
+
     def _is_complete(self, solution):
-        for (r,c), val in self.islands_map.items():
-            if self._current_bridges(r, c, solution) != val:
-                return False
-        return True
+        return self.degree == self.values
 
     def _select_mrv_island(self, solution):
         best = None
         best_score = -1
         
-        for (r,c), val in self.islands_map.items():
-            curr = self._current_bridges(r, c, solution)
-            remaining = val - curr
+        for island, val in enumerate(self.values):
+            remaining = val - self.degree[island]
             
             if remaining <= 0:
                 continue
             
             available = 0
-            for nr, nc in self.neighbors_map[(r,c)]:
-                key = self._normalize_key(r, c, nr, nc)
-                curr_b = solution.get(key, 0)
+            for edge, nbr in self.incident[island]:
+                curr_b = solution.get(edge, 0)
                 
                 if curr_b < 2:
-                    neighbor_curr = self._current_bridges(nr, nc, solution)
-                    neighbor_remaining = self.islands_map[(nr,nc)] - neighbor_curr
+                    neighbor_remaining = self.values[nbr] - self.degree[nbr]
                     
                     if neighbor_remaining > 0:
-                        if curr_b == 0 and not self._would_cross(key, solution):
+                        if curr_b == 0 and not self._would_cross(edge, solution):
                             available += 1
                         elif curr_b > 0:
                             available += 1
@@ -162,49 +224,41 @@ class BacktrackingSolver:
                 score = remaining / available
                 if score > best_score:
                     best_score = score
-                    best = (r, c)
+                    best = island
         
         return best
 
-    def _order_neighbors_lcv(self, r, c, solution):
-        neighbors = self.neighbors_map[(r,c)]
+    def _order_neighbors_lcv(self, island, solution):
         scores = []
         
-        for nr, nc in neighbors:
-            key = self._normalize_key(r, c, nr, nc)
-            curr_b = solution.get(key, 0)
+        for edge, nbr in self.incident[island]:
+            curr_b = solution.get(edge, 0)
             
             if curr_b >= 2:
                 continue
             
-            neighbor_curr = self._current_bridges(nr, nc, solution)
-            neighbor_remaining = self.islands_map[(nr,nc)] - neighbor_curr
+            neighbor_remaining = self.values[nbr] - self.degree[nbr]
             
             if neighbor_remaining <= 0:
                 continue
             
-            scores.append((neighbor_remaining, nr, nc))
+            scores.append((neighbor_remaining, nbr, edge))
         
         scores.sort(reverse=True)
-        return [(nr, nc) for _, nr, nc in scores]
+        return [(edge, nbr) for _, nbr, edge in scores]
 
     def _is_consistent(self, solution):
-        for (r,c), val in self.islands_map.items():
-            curr = self._current_bridges(r, c, solution)
+        for island, val in enumerate(self.values):
+            curr = self.degree[island]
             if curr > val:
                 return False
             
             remaining = val - curr
             if remaining > 0:
                 max_possible = 0
-                for nr, nc in self.neighbors_map[(r,c)]:
-                    key = self._normalize_key(r, c, nr, nc)
-                    curr_b = solution.get(key, 0)
-                    can_add = 2 - curr_b
-                    
-                    neighbor_curr = self._current_bridges(nr, nc, solution)
-                    neighbor_remaining = self.islands_map[(nr,nc)] - neighbor_curr
-                    
+                for edge, nbr in self.incident[island]:
+                    can_add = 2 - solution.get(edge, 0)
+                    neighbor_remaining = self.values[nbr] - self.degree[nbr]
                     max_possible += min(can_add, neighbor_remaining)
                 
                 if max_possible < remaining:
@@ -213,20 +267,14 @@ class BacktrackingSolver:
 
     def _detect_unsat_early(self, solution):
         # Check 1: Impossible capacity
-        for (r,c), val in self.islands_map.items():
-            curr = self._current_bridges(r, c, solution)
-            remaining = val - curr
+        for island, val in enumerate(self.values):
+            remaining = val - self.degree[island]
             
             if remaining > 0:
                 max_possible = 0
-                for nr, nc in self.neighbors_map[(r,c)]:
-                    key = self._normalize_key(r, c, nr, nc)
-                    curr_b = solution.get(key, 0)
-                    can_add = 2 - curr_b
-                    
-                    neighbor_curr = self._current_bridges(nr, nc, solution)
-                    neighbor_remaining = self.islands_map[(nr,nc)] - neighbor_curr
-                    
+                for edge, nbr in self.incident[island]:
+                    can_add = 2 - solution.get(edge, 0)
+                    neighbor_remaining = self.values[nbr] - self.degree[nbr]
                     max_possible += min(can_add, neighbor_remaining)
                 
                 if max_possible < remaining:
@@ -234,15 +282,13 @@ class BacktrackingSolver:
         
         # Check 2: Too many isolated islands
         unconnected = self._count_unconnected_islands(solution)
-        if unconnected > len(self.islands_map) * 0.7:
+        if unconnected > len(self.values) * 0.7:
             possible_new = 0
-            for (r,c) in self.islands_map.keys():
-                curr = self._current_bridges(r, c, solution)
-                if curr == 0:
-                    for nr, nc in self.neighbors_map[(r,c)]:
-                        key = self._normalize_key(r, c, nr, nc)
-                        if key not in solution:
-                            if not self._would_cross(key, solution):
+            for island in range(len(self.values)):
+                if self.degree[island] == 0:
+                    for edge, _ in self.incident[island]:
+                        if edge not in solution:
+                            if not self._would_cross(edge, solution):
                                 possible_new += 1
                                 break
             
@@ -252,67 +298,13 @@ class BacktrackingSolver:
         return False
 
     def _count_unconnected_islands(self, solution):
-        count = 0
-        for (r,c) in self.islands_map.keys():
-            if self._current_bridges(r, c, solution) == 0:
-                count += 1
-        return count
-
-    def _current_bridges(self, r, c, solution):
-        count = 0
-        for (r1,c1,r2,c2), k in solution.items():
-            if (r1==r and c1==c) or (r2==r and c2==c):
-                count += k
-        return count
+        return self.degree.count(0)
 
-    def _would_cross(self, new_key, solution):
-        r1a, c1a, r2a, c2a = new_key
-        is_h1 = (r1a == r2a)
-        
-        for (r1b, c1b, r2b, c2b) in solution.keys():
-            is_h2 = (r1b == r2b)
-            
-            if is_h1 == is_h2:
-                continue
-            
-            if is_h1:
-                if (min(c1a, c2a) < c1b < max(c1a, c2a) and
-                    min(r1b, r2b) < r1a < max(r1b, r2b)):
-                    return True
-            else:
-                if (min(c1b, c2b) < c1a < max(c1b, c2b) and
-                    min(r1a, r2a) < r1b < max(r1a, r2a)):
-                    return True
+    def _would_cross(self, new_edge, solution):
+        for edge in self.conflicts[new_edge]:
+            if edge in solution:
+                return True
         return False
 
     def _is_connected(self, solution):
-        if not self.game.islands:
-            return True
-        
-        graph = {(r, c): [] for r, c, _ in self.game.islands}
-        
-        for (r1, c1, r2, c2), num_bridges in solution.items():
-            if num_bridges > 0:
-                graph[(r1, c1)].append((r2, c2))
-                graph[(r2, c2)].append((r1, c1))
-        
-        start = (self.game.islands[0][0], self.game.islands[0][1])
-        visited = set()
-        stack = [start]
-        
-        while stack:
-            node = stack.pop()
-            if node in visited:
-                continue
-            visited.add(node)
-            
-            for neighbor in graph[node]:
-                if neighbor not in visited:
-                    stack.append(neighbor)
-        
-        return len(visited) == len(self.game.islands)
-
-    def _normalize_key(self, r1, c1, r2, c2):
-        if (r1, c1) > (r2, c2):
-            return (r2, c2, r1, c1)
-        return (r1, c1, r2, c2)
\ No newline at end of file
+        return self.graph.is_connected(e for e, k in solution.items() if k > 0)
@@ -13,15 +13,13 @@ from helper_01 import HashiwokakeroGame
 class BruteForceSolver:
     def __init__(self, game: HashiwokakeroGame):
         self.game = game
+        self.graph = game.graph
+        self.values = self.graph.island_values.tolist()
+        self.conflicts = self.graph.conflicts()
         self.nodes_explored = 0
         
-        # Tạo danh sách TẤT CẢ kết nối có thể
-        self.all_possible_connections = []
-        for r, c, _ in game.islands:
-            neighbors = game.get_neighbors(r, c)
-            for nr, nc in neighbors:
-                if (r, c) < (nr, nc):  
-                    self.all_possible_connections.append((r, c, nr, nc))
+        # Tạo danh sách TẤT CẢ kết nối có thể (id cạnh ứng viên)
+        self.all_possible_connections = list(range(self.graph.num_edges))
         
         self.num_connections = len(self.all_possible_connections)
         
@@ -55,7 +53,7 @@ class BruteForceSolver:
                 print(f"✓ Found solution!")
                 print(f"  - Combinations tried: {self.nodes_explored:,}")
                 print(f"  - Percentage: {self.nodes_explored/self.total_combinations*100:.4f}%")
-                return solution, elapsed
+                return self.graph.to_solution(solution), elapsed
             
             # Progress report
             if self.nodes_explored % 100_000 == 0:
@@ -75,91 +73,44 @@ class BruteForceSolver:
     
     def _is_valid_solution(self, solution: Dict) -> bool:
         # Check 1: Số cầu mỗi đảo
-        bridges_count = {}
-        for r, c, val in self.game.islands:
-            bridges_count[(r, c)] = 0
-        
-        for (r1, c1, r2, c2), num_bridges in solution.items():
-            bridges_count[(r1, c1)] = bridges_count.get((r1, c1), 0) + num_bridges
-            bridges_count[(r2, c2)] = bridges_count.get((r2, c2), 0) + num_bridges
-        
-        for r, c, required in self.game.islands:
-            if bridges_count.get((r, c), 0) != required:
-                return False
+        degree = [0] * len(self.values)
+        endpoints = self.graph.endpoints()
+        for edge, num_bridges in solution.items():
+            u, v = endpoints[edge]
+            degree[u] += num_bridges
+            degree[v] += num_bridges
+        
+        if degree != self.values:
+            return False
         
-        # Check 2: Không có cầu cắt nhau
-        bridges_list = list(solution.keys())
-        for i in range(len(bridges_list)):
-            for j in range(i + 1, len(bridges_list)):
-                if self._bridges_cross(bridges_list[i], bridges_list[j]):
+        # Check 2: Không có cầu cắt nhau (tra bảng xung đột)
+        for edge in solution:
+            for other in self.conflicts[edge]:
+                if other in solution:
                     return False
         
-        # Check 3: Connectivity (dùng DFS/BFS)
+        # Check 3: Connectivity (dùng union-find trên id đảo)
         if not self._is_connected(solution):
             return False
         
         return True
     
-    def _bridges_cross(self, bridge1: tuple, bridge2: tuple) -> bool:
-        r1a, c1a, r2a, c2a = bridge1
-        r1b, c1b, r2b, c2b = bridge2
-        
-        is_h1 = (r1a == r2a)
-        is_h2 = (r1b == r2b)
-        
-        if is_h1 == is_h2:
-            return False
-        
-        if is_h1:  
-            return (min(c1a, c2a) < c1b < max(c1a, c2a) and
-                    min(r1b, r2b) < r1a < max(r1b, r2b))
-        else:  
-            return (min(c1b, c2b) < c1a < max(c1b, c2b) and
-                    min(r1a, r2a) < r1b < max(r1a, r2a))
-    
     def _is_connected(self, solution: Dict) -> bool:
-        if not self.game.islands:
-            return True
-        
-        # Build adjacency list
-        graph = {(r, c): [] for r, c, _ in self.game.islands}
-        
-        for (r1, c1, r2, c2), num_bridges in solution.items():
-            if num_bridges > 0:
-                graph[(r1, c1)].append((r2, c2))
-                graph[(r2, c2)].append((r1, c1))
-        
-        # DFS từ đảo đầu tiên
-        start = (self.game.islands[0][0], self.game.islands[0][1])
-        visited = set()
-        stack = [start]
-        
-        while stack:
-            node = stack.pop()
-            if node in visited:
-                continue
-            visited.add(node)
-            
-            for neighbor in graph[node]:
-                if neighbor not in visited:
-                    stack.append(neighbor)
-        
-        # Tất cả đảo phải được visit
-        return len(visited) == len(self.game.islands)
+        return self.graph.is_connected(e for e, k in solution.items() if k > 0)
 
 
 class OptimizedBruteForceSolver:
     def __init__(self, game: HashiwokakeroGame):
         self.game = game
+        self.graph = game.graph
+        self.values = self.graph.island_values.tolist()
+        self.endpoints = self.graph.endpoints()
+        self.conflicts = self.graph.conflicts()
+        self.degree = [0] * len(self.values)
         self.nodes_explored = 0
         
-        # Tạo danh sách connections
-        self.connections = []
-        for r, c, _ in game.islands:
-            neighbors = game.get_neighbors(r, c)
-            for nr, nc in neighbors:
-                if (r, c) < (nr, nc):
-                    self.connections.append((r, c, nr, nc))
+        # Tạo danh sách connections (id cạnh ứng viên)
+        self.connections = list(range(self.graph.num_edges))
     
     def solve(self) -> Tuple[Dict, float]:
         print("\nSolving with Optimized Brute Force...")
@@ -172,7 +123,7 @@ class OptimizedBruteForceSolver:
         if result:
             print(f" Found solution!")
             print(f"  - Nodes explored: {self.nodes_explored:,}")
-            return result, elapsed
+            return self.graph.to_solution(result), elapsed
         else:
             print(f" No solution")
             print(f"  - Nodes explored: {self.nodes_explored:,}")
@@ -209,97 +160,48 @@ class OptimizedBruteForceSolver:
             return result
         
         # Try 1 cầu
+        u, v = self.endpoints[conn]
         solution[conn] = 1
+        self.degree[u] += 1
+        self.degree[v] += 1
         result = self._backtrack_with_pruning(idx + 1, solution)
         if result:
             return result
-        del solution[conn]
         
         # Try 2 cầu
         solution[conn] = 2
+        self.degree[u] += 1
+        self.degree[v] += 1
         result = self._backtrack_with_pruning(idx + 1, solution)
         if result:
             return result
         del solution[conn]
+        self.degree[u] -= 2
+        self.degree[v] -= 2
         
         return None
     
     def _is_valid_partial(self, solution: Dict) -> bool:
-        bridges_count = {}
-        for r, c, val in self.game.islands:
-            bridges_count[(r, c)] = 0
-        
-        for (r1, c1, r2, c2), num_bridges in solution.items():
-            bridges_count[(r1, c1)] += num_bridges
-            bridges_count[(r2, c2)] += num_bridges
-        
-        for r, c, required in self.game.islands:
-            if bridges_count.get((r, c), 0) > required:
+        for curr, required in zip(self.degree, self.values):
+            if curr > required:
                 return False
         
         return True
     
     def _is_complete_solution(self, solution: Dict) -> bool:
         # Check số cầu
-        bridges_count = {}
-        for r, c, val in self.game.islands:
-            bridges_count[(r, c)] = 0
-        
-        for (r1, c1, r2, c2), num_bridges in solution.items():
-            bridges_count[(r1, c1)] += num_bridges
-            bridges_count[(r2, c2)] += num_bridges
-        
-        for r, c, required in self.game.islands:
-            if bridges_count.get((r, c), 0) != required:
-                return False
+        if self.degree != self.values:
+            return False
         
         # Check connectivity
         return self._is_connected(solution)
     
-    def _would_cross(self, new_conn: tuple, solution: Dict) -> bool:
-        r1a, c1a, r2a, c2a = new_conn
-        is_h1 = (r1a == r2a)
-        
-        for (r1b, c1b, r2b, c2b) in solution.keys():
-            is_h2 = (r1b == r2b)
-            
-            if is_h1 == is_h2:
-                continue
-            
-            if is_h1:  # New ngang, old dọc
-                if (min(c1a, c2a) < c1b < max(c1a, c2a) and
-                    min(r1b, r2b) < r1a < max(r1b, r2b)):
-                    return True
-            else:  # New dọc, old ngang
-                if (min(c1b, c2b) < c1a < max(c1b, c2b) and
-                    min(r1a, r2a) < r1b < max(r1a, r2a)):
-                    return True
+    def _would_cross(self, new_conn: int, solution: Dict) -> bool:
+        for conn in self.conflicts[new_conn]:
+            if conn in solution:
+                return True
         
         return False
     
     def _is_connected(self, solution: Dict) -> bool:
-        if not self.game.islands:
-            return True
-        
-        graph = {(r, c): [] for r, c, _ in self.game.islands}
-        
-        for (r1, c1, r2, c2), num_bridges in solution.items():
-            if num_bridges > 0:
-                graph[(r1, c1)].append((r2, c2))
-                graph[(r2, c2)].append((r1, c1))
-        
-        start = (self.game.islands[0][0], self.game.islands[0][1])
-        visited = set()
-        stack = [start]
-        
-        while stack:
-            node = stack.pop()
-            if node in visited:
-                continue
-            visited.add(node)
-            
-            for neighbor in graph[node]:
-                if neighbor not in visited:
-                    stack.append(neighbor)
-        
-        return len(visited) == len(self.game.islands)
\ No newline at end of file
+        return self.graph.is_connected(e for e, k in solution.items() if k > 0)
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, Iterator, List, Tuple
+
+from helper_01 import HashiwokakeroGame, game_from_record, game_to_record
+
+DEFAULT_CNF_CACHE_DIR = os.path.join("Source", ".cache", "cnf")
+# Part of every cache key: bump it whenever CNFGenerator changes the clauses
+# it emits, so formulas cached by an older encoder are not replayed
+CNF_FORMAT_VERSION = 1
+# CNFGenerator settings that change the formula
+ENCODING_OPTIONS = ('connectivity', 'capacity', 'multiplicity', 'redundant')
+# Bytes copied at a time when DimacsWriter puts the header in front of the body
+COPY_BUFFER_SIZE = 1 << 20
+
+
+def sidecar_path(path: str) -> str:
+    return str(path) + '.json'
+
+
+def encoding_options(cnf_gen) -> Dict:
+    return {name: getattr(cnf_gen, name) for name in ENCODING_OPTIONS}
+
+
+def bridge_var_map(game: HashiwokakeroGame) -> List[List[int]]:
+    """[var, r1, c1, r2, c2, k] for every bridge variable of the puzzle."""
+    return [[2 * edge + k, *key, k]
+            for edge, key in enumerate(game.graph.edge_keys()) for k in (1, 2)]
+
+
+class DimacsWriter:
+    """
+    Writes clauses to a DIMACS file as they arrive, counting clauses and
+    the largest variable. They go to a body file (<path>.body) first;
+    close() writes the comments and the `p cnf` line, then the body.
+    """
+
+    def __init__(self, path: str, comments: List[str] = ()):
+        self.path = path
+        self.comments = list(comments)
+        self.body_path = f"{path}.body"
+        self.file = open(self.body_path, 'w', encoding='ascii')
+        self.num_vars = 0
+        self.num_clauses = 0
+
+    def write(self, clauses: List[List[int]]):
+        """Appends a chunk of clauses; usable as an emit_cnf() sink."""
+        lines = []
+        for clause in clauses:
+            if clause:
+                self.num_vars = max(self.num_vars, max(map(abs, clause)))
+            lines.append(' '.join(map(str, clause)) + ' 0\n' if clause else '0\n')
+        self.file.write(''.join(lines))
+        self.num_clauses += len(clauses)
+
+    def close(self, num_vars: int = 0):
+        """Writes the file; `num_vars` covers variables no clause uses."""
+        self.num_vars = max(self.num_vars, num_vars)
+        self.file.close()
+        try:
+            with open(self.path, 'w', encoding='ascii') as out, \
+                    open(self.body_path, encoding='ascii') as body:
+                for line in self.comments:
+                    out.write(line + '\n')
+                out.write(f"p cnf {self.num_vars} {self.num_clauses}\n")
+                shutil.copyfileobj(body, out, COPY_BUFFER_SIZE)
+        finally:
+            os.remove(self.body_path)
+
+
+def export_dimacs(cnf_gen, path: str, sink=None) -> bool:
+    """
+    Generates a CNFGenerator's formula straight into a DIMACS file, plus a
+    JSON sidecar (<path>.json) holding the puzzle, the encoding options and
+    the bridge key of every bridge variable. `sink`, if given, also gets
+    every chunk, as with emit_cnf(). Returns False on a local conflict,
+    which is written as the empty clause.
+    """
+    options = encoding_options(cnf_gen)
+    comments = [f"c hashiwokakero {json.dumps(options, sort_keys=True)}"]
+    writer = DimacsWriter(path, comments)
+
+    def tee(chunk):
+        writer.write(chunk)
+        if sink is not None:
+            sink(chunk)
+
+    try:
+        ok = cnf_gen.emit_cnf(tee)
+    finally:
+        writer.close(cnf_gen.var_counter - 1)
+    if not ok:
+        writer = DimacsWriter(path, comments)
+        writer.write([[]])
+        writer.close(cnf_gen.var_counter - 1)
+
+    meta = {
+        'puzzle': game_to_record(os.path.basename(path), cnf_gen.game),
+        'options': options,
+        'num_vars': writer.num_vars,
+        'bridge_vars': bridge_var_map(cnf_gen.game),
+        'clauses_by_category': cnf_gen.clause_counts,
+        'vars_by_category': cnf_gen.var_counts,
+    }
+    with open(sidecar_path(path), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, separators=(',', ':'))
+    return ok
+
+
+class DimacsFormula:
+    """
+    A formula written by export_dimacs(), read lazily: `clauses` parses the
+    file again on each use and yields one clause at a time, so replaying it
+    never holds the whole formula. `clause_counts` and `var_counts` are the
+    categories recorded in the sidecar (None in sidecars that predate them).
+    """
+
+    def __init__(self, path: str, meta: Dict):
+        self.path = path
+        self.nv = meta['num_vars']
+        self.clause_counts = meta.get('clauses_by_category')
+        self.var_counts = meta.get('vars_by_category')
+
+    @property
+    def clauses(self) -> Iterator[List[int]]:
+        clause = []
+        with open(self.path, encoding='ascii') as f:
+            for line in f:
+                if line[:1] in ('c', 'p'):
+                    continue
+                for lit in map(int, line.split()):
+                    if lit:
+                        clause.append(lit)
+                    else:
+                        yield clause
+                        clause = []
+
+
+def import_dimacs(path: str) -> Tuple[HashiwokakeroGame, Dict, DimacsFormula]:
+    """
+    Reads a formula written by export_dimacs() back as (game, encoding
+    options, DimacsFormula). Raises ValueError if the sidecar's variable
+    numbering does not match the puzzle, e.g. after another tool renumbered it.
+    """
+    with open(sidecar_path(path), encoding='utf-8') as f:
+        meta = json.load(f)
+    game = game_from_record(meta['puzzle'])
+    if meta['bridge_vars'] != bridge_var_map(game):
+        raise ValueError(f"{path}: bridge variables do not match the puzzle")
+    return game, meta['options'], DimacsFormula(path, meta)
+
+
+class CNFCache:
+    """
+    Directory of generated formulas in DIMACS (with sidecars), one per
+    exact puzzle and encoding options. Unlike SolutionCache the key is the
+    puzzle as given, not its canonical form: variable ids follow the edge
+    order, which a rotation changes.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CNF_CACHE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, cnf_gen) -> str:
+        options = json.dumps([CNF_FORMAT_VERSION, encoding_options(cnf_gen)], sort_keys=True)
+        digest = hashlib.sha256(options.encode('utf-8')).hexdigest()[:16]
+        name = f"{cnf_gen.game.content_hash(canonical=False)}-{digest}.cnf"
+        return os.path.join(self.directory, name)
+
+    def emit(self, cnf_gen, sink) -> bool:
+        """
+        cnf_gen.emit_cnf(sink) through the cache: a stored formula is
+        streamed back from its file, otherwise the generated one is stored
+        on the way. Formulas
+        with selectors depend on more than the options and are not cached.
+        """
+        if cnf_gen.selectors or cnf_gen.all_values or cnf_gen.formula is not None:
+            return cnf_gen.emit_cnf(sink)
+        path = self.path_for(cnf_gen)
+        if os.path.exists(path) and os.path.exists(sidecar_path(path)):
+            self.hits += 1
+            _, _, cnf_gen.formula = import_dimacs(path)
+            return cnf_gen.emit_cnf(sink)
+
+        self.misses += 1
+        # Write aside and rename, so a concurrent run never reads a partial file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        ok = export_dimacs(cnf_gen, tmp, sink)
+        os.replace(sidecar_path(tmp), sidecar_path(path))
+        os.replace(tmp, path)
+        return ok
@@ -1,5 +1,9 @@
+import hashlib
+import json
+import os
 import numpy as np
-from typing import List, Tuple, Set
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple, Set
 
 BRIDGE_SYMBOLS = {
     'h1': '-',
@@ -12,55 +16,470 @@ BRIDGE_SYMBOLS = {
 DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
 
 
+# The 8 dihedral symmetries of a board as (transpose, flip rows, flip cols),
+# applied in that order. Symmetry 0 is the identity.
+SYMMETRIES = [(t, fr, fc) for t in (False, True) for fr in (False, True) for fc in (False, True)]
+
+
+def apply_symmetry(rows: np.ndarray, cols: np.ndarray, shape: Tuple[int, int], symmetry: int):
+    """Maps coordinates on a board of `shape` through a symmetry; returns (rows, cols, new shape)."""
+    transpose, flip_rows, flip_cols = SYMMETRIES[symmetry]
+    height, width = shape
+    if transpose:
+        rows, cols, height, width = cols, rows, width, height
+    if flip_rows:
+        rows = height - 1 - rows
+    if flip_cols:
+        cols = width - 1 - cols
+    return rows, cols, (height, width)
+
+
+def invert_symmetry(rows: np.ndarray, cols: np.ndarray, shape: Tuple[int, int], symmetry: int):
+    """Inverse of apply_symmetry; `shape` is the shape of the transformed board."""
+    transpose, flip_rows, flip_cols = SYMMETRIES[symmetry]
+    height, width = shape
+    if flip_rows:
+        rows = height - 1 - rows
+    if flip_cols:
+        cols = width - 1 - cols
+    if transpose:
+        rows, cols, height, width = cols, rows, width, height
+    return rows, cols, (height, width)
+
+
+def transform_solution(solution: dict, shape: Tuple[int, int], symmetry: int,
+                       inverse: bool = False) -> dict:
+    """
+    Moves a {(r1, c1, r2, c2): count} solution through a symmetry (or its
+    inverse), keeping keys normalized with the row-major smaller end first.
+    """
+    if not solution:
+        return {}
+    keys = np.array(list(solution.keys()), dtype=np.int64).reshape(-1, 4)
+    move = invert_symmetry if inverse else apply_symmetry
+    r1, c1, _ = move(keys[:, 0], keys[:, 1], shape, symmetry)
+    r2, c2, _ = move(keys[:, 2], keys[:, 3], shape, symmetry)
+
+    result = {}
+    for key, count in zip(zip(r1.tolist(), c1.tolist(), r2.tolist(), c2.tolist()), solution.values()):
+        if (key[0], key[1]) > (key[2], key[3]):
+            key = (key[2], key[3], key[0], key[1])
+        result[key] = count
+    return result
+
+
+def discover_edges(rows: np.ndarray, cols: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Candidate edges of a puzzle from its island coordinates in row-major order.
+
+    Two islands can be bridged exactly when they are consecutive in their row
+    or in their column, so one sweep over the row-major order and one over the
+    column-major order find every edge. Edges come back sorted by their
+    smaller endpoint, the vertical (down) edge before the horizontal (right) one.
+    """
+    rows = np.asarray(rows)
+    cols = np.asarray(cols)
+    ids = np.arange(len(rows), dtype=np.int32)
+
+    same_row = rows[1:] == rows[:-1]
+    h_u, h_v = ids[:-1][same_row], ids[1:][same_row]
+
+    by_col = np.lexsort((rows, cols)).astype(np.int32)
+    same_col = cols[by_col][1:] == cols[by_col][:-1]
+    v_u, v_v = by_col[:-1][same_col], by_col[1:][same_col]
+
+    edge_u = np.concatenate([v_u, h_u])
+    edge_v = np.concatenate([v_v, h_v])
+    horizontal = np.concatenate([np.zeros(len(v_u), dtype=np.int8), np.ones(len(h_u), dtype=np.int8)])
+    order = np.lexsort((horizontal, edge_u))
+    return edge_u[order], edge_v[order]
+
+
+def component_labels(num_nodes: int, pairs) -> List[int]:
+    """Union-find over node ids; returns the root label of every node."""
+    parent = list(range(num_nodes))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for u, v in pairs:
+        ru, rv = find(u), find(v)
+        if ru != rv:
+            parent[ru] = rv
+    return [find(x) for x in range(num_nodes)]
+
+
+class PuzzleGraph:
+    """
+    Integer-indexed view of a puzzle, built once and shared by every solver.
+
+    Islands are numbered 0..n-1 in row-major order and candidate edges
+    0..m-1, each edge going from the smaller island id (edge_u) to the
+    larger one (edge_v). Adjacency is stored in CSR form: the neighbors of
+    island i are adj_island[adj_ptr[i]:adj_ptr[i + 1]] and the matching
+    edge ids are adj_edge[...], ordered up, down, left, right like
+    get_neighbors.
+    """
+
+    def __init__(self, island_rows, island_cols, island_values, edge_u, edge_v):
+        self.island_rows = np.asarray(island_rows, dtype=np.int32)
+        self.island_cols = np.asarray(island_cols, dtype=np.int32)
+        self.island_values = np.asarray(island_values, dtype=np.int32)
+        self.edge_u = np.asarray(edge_u, dtype=np.int32)
+        self.edge_v = np.asarray(edge_v, dtype=np.int32)
+        self.edge_horizontal = self.island_rows[self.edge_u] == self.island_rows[self.edge_v]
+        # Segment geometry: the fixed coordinate (row of a horizontal edge,
+        # column of a vertical one) and the exclusive span along the other axis.
+        self.edge_line = np.where(self.edge_horizontal, self.island_rows[self.edge_u],
+                                  self.island_cols[self.edge_u]).astype(np.int32)
+        self.edge_lo = np.where(self.edge_horizontal, self.island_cols[self.edge_u],
+                                self.island_rows[self.edge_u]).astype(np.int32)
+        self.edge_hi = np.where(self.edge_horizontal, self.island_cols[self.edge_v],
+                                self.island_rows[self.edge_v]).astype(np.int32)
+
+        self.num_islands = len(self.island_rows)
+        self.num_edges = len(self.edge_u)
+        self.island_ids = {(int(r), int(c)): i for i, (r, c) in
+                           enumerate(zip(self.island_rows, self.island_cols))}
+
+        self._build_adjacency()
+        self._build_conflicts()
+        self._incident = None
+        self._conflicts = None
+        self._endpoints = None
+
+    def _build_adjacency(self):
+        # Every edge appears twice, once per endpoint. Direction rank seen
+        # from the endpoint: up=0, down=1, left=2, right=3.
+        edges = np.arange(self.num_edges, dtype=np.int32)
+        owner = np.concatenate([self.edge_u, self.edge_v])
+        other = np.concatenate([self.edge_v, self.edge_u])
+        edge_ids = np.concatenate([edges, edges])
+        horizontal = np.concatenate([self.edge_horizontal, self.edge_horizontal])
+        rank = np.where(horizontal, 2, 0) + np.concatenate(
+            [np.ones(self.num_edges, dtype=np.int32), np.zeros(self.num_edges, dtype=np.int32)])
+
+        order = np.lexsort((rank, owner))
+        self.adj_island = other[order].astype(np.int32)
+        self.adj_edge = edge_ids[order].astype(np.int32)
+        counts = np.bincount(owner, minlength=self.num_islands)
+        self.adj_ptr = np.zeros(self.num_islands + 1, dtype=np.int32)
+        np.cumsum(counts, out=self.adj_ptr[1:])
+
+    def _build_conflicts(self):
+        """
+        Crossing-conflict index in CSR form: the edges crossing edge e are
+        conflict_edge[conflict_ptr[e]:conflict_ptr[e + 1]], in ascending order.
+
+        Sweep over columns: a horizontal edge is active on the columns strictly
+        inside its span, and each vertical edge queries the active rows strictly
+        inside its own span. Active horizontal edges never share a row, so a
+        sorted row list answers each query with two bisections.
+        """
+        # Edges between adjacent cells have an empty interior and cross nothing
+        spans = self.edge_hi - self.edge_lo > 1
+        horizontal = np.flatnonzero(self.edge_horizontal & spans)
+        vertical = np.flatnonzero(~self.edge_horizontal & spans)
+
+        # Events (column, kind, edge); at equal columns removals (0) come
+        # before insertions (1), which come before queries (2).
+        columns = np.concatenate([self.edge_hi[horizontal], self.edge_lo[horizontal] + 1,
+                                  self.edge_line[vertical]])
+        kinds = np.concatenate([np.zeros(len(horizontal), dtype=np.int8),
+                                np.ones(len(horizontal), dtype=np.int8),
+                                np.full(len(vertical), 2, dtype=np.int8)])
+        edges = np.concatenate([horizontal, horizontal, vertical])
+        order = np.lexsort((kinds, columns))
+
+        line, lo, hi = self.edge_line.tolist(), self.edge_lo.tolist(), self.edge_hi.tolist()
+        active_rows, active_edges = [], []
+        pairs_a, pairs_b = [], []
+        for kind, e in zip(kinds[order].tolist(), edges[order].tolist()):
+            if kind == 0:
+                idx = bisect_left(active_rows, line[e])
+                del active_rows[idx], active_edges[idx]
+            elif kind == 1:
+                idx = bisect_left(active_rows, line[e])
+                active_rows.insert(idx, line[e])
+                active_edges.insert(idx, e)
+            else:
+                first = bisect_right(active_rows, lo[e])
+                last = bisect_left(active_rows, hi[e])
+                for h in active_edges[first:last]:
+                    pairs_a.append(h)
+                    pairs_b.append(e)
+
+        owner = np.array(pairs_a + pairs_b, dtype=np.int32)
+        other = np.array(pairs_b + pairs_a, dtype=np.int32)
+        order = np.lexsort((other, owner))
+        self.conflict_edge = other[order]
+        counts = np.bincount(owner, minlength=self.num_edges)
+        self.conflict_ptr = np.zeros(self.num_edges + 1, dtype=np.int32)
+        np.cumsum(counts, out=self.conflict_ptr[1:])
+        self.num_conflicts = len(pairs_a)
+
+    def degree(self, island: int) -> int:
+        return int(self.adj_ptr[island + 1] - self.adj_ptr[island])
+
+    def incident(self) -> List[List[Tuple[int, int]]]:
+        """(edge id, neighbor id) pairs per island as plain lists for hot loops."""
+        if self._incident is None:
+            ptr = self.adj_ptr.tolist()
+            edges = self.adj_edge.tolist()
+            nbrs = self.adj_island.tolist()
+            self._incident = [list(zip(edges[ptr[i]:ptr[i + 1]], nbrs[ptr[i]:ptr[i + 1]]))
+                              for i in range(self.num_islands)]
+        return self._incident
+
+    def edge_key(self, edge: int) -> Tuple[int, int, int, int]:
+        u, v = self.edge_u[edge], self.edge_v[edge]
+        return (int(self.island_rows[u]), int(self.island_cols[u]),
+                int(self.island_rows[v]), int(self.island_cols[v]))
+
+    def edge_keys(self) -> List[Tuple[int, int, int, int]]:
+        return list(zip(self.island_rows[self.edge_u].tolist(), self.island_cols[self.edge_u].tolist(),
+                        self.island_rows[self.edge_v].tolist(), self.island_cols[self.edge_v].tolist()))
+
+    def conflicts(self) -> List[List[int]]:
+        """Edges crossing each edge as plain lists for hot loops."""
+        if self._conflicts is None:
+            ptr = self.conflict_ptr.tolist()
+            edges = self.conflict_edge.tolist()
+            self._conflicts = [edges[ptr[e]:ptr[e + 1]] for e in range(self.num_edges)]
+        return self._conflicts
+
+    def edge_id(self, key: tuple):
+        """Edge id of a (r1, c1, r2, c2) bridge key, or None if it is not a candidate edge."""
+        u = self.island_ids.get((key[0], key[1]))
+        v = self.island_ids.get((key[2], key[3]))
+        if u is None or v is None:
+            return None
+        if u > v:
+            u, v = v, u
+        for edge, nbr in self.incident()[u]:
+            if nbr == v:
+                return edge
+        return None
+
+    def endpoints(self) -> List[Tuple[int, int]]:
+        if self._endpoints is None:
+            self._endpoints = list(zip(self.edge_u.tolist(), self.edge_v.tolist()))
+        return self._endpoints
+
+    def components(self, used_edges) -> List[int]:
+        """Component label of every island when only used_edges carry bridges."""
+        endpoints = self.endpoints()
+        return component_labels(self.num_islands, (endpoints[e] for e in used_edges))
+
+    def component_cuts(self, labels) -> List[List[int]]:
+        """
+        For each component in `labels` (as returned by components), the
+        candidate edges with exactly one endpoint inside it. Identical cuts
+        (e.g. the two sides of a split in two) are reported once.
+        """
+        cuts = {label: [] for label in labels}
+        for e, (u, v) in enumerate(self.endpoints()):
+            if labels[u] != labels[v]:
+                cuts[labels[u]].append(e)
+                cuts[labels[v]].append(e)
+        unique = {}
+        for cut in cuts.values():
+            unique.setdefault(tuple(cut), cut)
+        return list(unique.values())
+
+    def is_connected(self, used_edges) -> bool:
+        if self.num_islands == 0:
+            return True
+        return len(set(self.components(used_edges))) == 1
+
+    def to_solution(self, bridges: dict) -> dict:
+        """Converts {edge id: count} into the public {(r1, c1, r2, c2): count} form."""
+        return {self.edge_key(e): k for e, k in bridges.items() if k > 0}
+
+
 class HashiwokakeroGame:
-    def __init__(self, filename=None, grid=None):
+    """
+    A puzzle stored sparsely: board shape plus one packed (n, 3) array of
+    (row, col, value) islands in row-major order. The dense grid is only
+    materialized on request, and the islands list and the PuzzleGraph are
+    built lazily on first use, so many puzzles can be held resident cheaply.
+    """
+
+    __slots__ = ('rows', 'cols', '_cells', '_islands', '_graph')
+
+    def __init__(self, filename=None, grid=None, shape=None, islands=None):
         if filename:
-            self.grid = self.read_input(filename)
+            shape, islands = self.read_input(filename)
         elif grid is not None:
-            self.grid = np.array(grid)
-        else:
-            raise ValueError("Cần cung cấp filename hoặc grid")
+            shape, islands = self._islands_from_grid(np.array(grid))
+        elif shape is None or islands is None:
+            raise ValueError("Cần cung cấp filename, grid hoặc shape + islands")
         
-        self.rows, self.cols = self.grid.shape
-        self.islands = self.find_islands()
-        self.bridges = {}
+        self.rows, self.cols = int(shape[0]), int(shape[1])
+        self._cells = self._pack_islands(islands)
+        self._islands = None
+        self._graph = None
+
+    @property
+    def island_rows(self) -> np.ndarray:
+        return self._cells[:, 0]
+
+    @property
+    def island_cols(self) -> np.ndarray:
+        return self._cells[:, 1]
+
+    @property
+    def island_values(self) -> np.ndarray:
+        return self._cells[:, 2]
+
+    @property
+    def islands(self) -> List[Tuple[int, int, int]]:
+        if self._islands is None:
+            self._islands = self.find_islands()
+        return self._islands
+
+    @property
+    def graph(self) -> 'PuzzleGraph':
+        if self._graph is None:
+            self._graph = self.build_graph()
+        return self._graph
+
+    def release(self):
+        """Drops the lazily built structures, keeping only the packed islands."""
+        self._islands = None
+        self._graph = None
+
+    def transformed(self, symmetry: int) -> 'HashiwokakeroGame':
+        """The same puzzle rotated/reflected by one of the 8 SYMMETRIES."""
+        rows, cols, shape = apply_symmetry(self.island_rows.astype(np.int64),
+                                           self.island_cols.astype(np.int64),
+                                           (self.rows, self.cols), symmetry)
+        return HashiwokakeroGame(shape=shape, islands=np.column_stack([rows, cols, self.island_values]))
+
+    def _content_bytes(self, symmetry: int = 0) -> bytes:
+        game = self.transformed(symmetry) if symmetry else self
+        # Explicit little-endian, so hashes and the canonical choice match across hosts
+        header = np.array([game.rows, game.cols], dtype='<i4')
+        return header.tobytes() + game._cells.astype('<i4').tobytes()
+
+    def canonical_form(self) -> Tuple[bytes, int]:
+        """
+        Canonical encoding of the puzzle under the 8 board symmetries and
+        the symmetry that maps this puzzle onto it. Rotated or mirrored
+        copies of a puzzle share the same canonical bytes.
+        """
+        forms = [(self._content_bytes(symmetry), symmetry) for symmetry in range(len(SYMMETRIES))]
+        return min(forms)
+
+    def canonical(self) -> Tuple['HashiwokakeroGame', int]:
+        _, symmetry = self.canonical_form()
+        return self.transformed(symmetry), symmetry
+
+    def content_hash(self, canonical: bool = True) -> str:
+        """Stable SHA-256 of the puzzle, symmetry-invariant unless canonical=False."""
+        data = self.canonical_form()[0] if canonical else self._content_bytes()
+        return hashlib.sha256(data).hexdigest()
+
+    def solution_to_canonical(self, solution: dict, symmetry: int) -> dict:
+        return transform_solution(solution, (self.rows, self.cols), symmetry)
+
+    def solution_from_canonical(self, solution: dict, symmetry: int) -> dict:
+        """Maps a solution of the canonical puzzle back onto this orientation."""
+        _, _, shape = apply_symmetry(np.zeros(0), np.zeros(0), (self.rows, self.cols), symmetry)
+        return transform_solution(solution, shape, symmetry, inverse=True)
+
+    @property
+    def grid(self) -> np.ndarray:
+        grid = np.zeros((self.rows, self.cols), dtype=np.int8)
+        grid[self.island_rows, self.island_cols] = self.island_values
+        return grid
+
+    def _pack_islands(self, islands) -> np.ndarray:
+        islands = np.asarray(islands, dtype=np.int64).reshape(-1, 3)
+        islands = islands[islands[:, 2] > 0]
+        rows, cols, values = islands[:, 0], islands[:, 1], islands[:, 2]
+
+        if len(islands):
+            if rows.min() < 0 or rows.max() >= self.rows or cols.min() < 0 or cols.max() >= self.cols:
+                raise ValueError(f"Đảo nằm ngoài lưới {self.rows}x{self.cols}")
+            if values.max() > 8:
+                raise ValueError("Giá trị đảo phải nằm trong khoảng 1-8")
+
+        linear = rows * self.cols + cols
+        order = np.argsort(linear, kind='stable')
+        if np.any(np.diff(linear[order]) == 0):
+            raise ValueError("Có hai đảo trùng tọa độ")
+
+        dtype = np.int16 if max(self.rows, self.cols) <= np.iinfo(np.int16).max else np.int32
+        return islands[order].astype(dtype)
+
+    @staticmethod
+    def _islands_from_grid(grid: np.ndarray):
+        rows, cols = np.nonzero(grid > 0)
+        return grid.shape, np.column_stack([rows, cols, grid[rows, cols]])
         
-    def read_input(self, filename: str) -> np.ndarray:
+    def read_input(self, filename: str):
+        """
+        Reads a puzzle file and returns (shape, islands) where islands is an
+        (n, 3) array of (row, col, value).
+
+        Two formats are accepted:
+          - dense: one comma-separated row of cell values per line;
+          - sparse: a "rows cols" header line followed by one "r c value"
+            line per island, for large and mostly empty boards.
+        """
         with open(filename, 'r') as f:
-            lines = f.readlines()
+            lines = [line.strip() for line in f]
+        lines = [line for line in lines if line and not line.startswith('#')]
+
+        if lines and ',' not in lines[0] and len(lines[0].split()) == 2:
+            rows, cols = (int(x) for x in lines[0].split())
+            islands = [[int(x) for x in line.split()] for line in lines[1:]]
+            if any(len(entry) != 3 for entry in islands):
+                raise ValueError("Định dạng sparse: mỗi dòng đảo phải có dạng 'r c value'")
+            return (rows, cols), np.array(islands, dtype=np.int64).reshape(-1, 3)
         
         grid = []
         for line in lines:
-            line = line.strip()
-            if line:
-                row = [int(x.strip()) for x in line.split(',')]
-                grid.append(row)
+            row = [int(x.strip()) for x in line.split(',')]
+            grid.append(row)
         
-        return np.array(grid)
+        return self._islands_from_grid(np.array(grid))
     
     def find_islands(self) -> List[Tuple[int, int, int]]:
-        islands = []
-        for i in range(self.rows):
-            for j in range(self.cols):
-                if self.grid[i][j] > 0:
-                    islands.append((i, j, self.grid[i][j]))
-        return islands
+        return list(zip(self.island_rows.tolist(), self.island_cols.tolist(),
+                        self.island_values.tolist()))
     
     def get_neighbors(self, row: int, col: int) -> List[Tuple[int, int]]:
+        graph = self.graph
+        island = graph.island_ids.get((row, col))
+        if island is not None:
+            start, end = graph.adj_ptr[island], graph.adj_ptr[island + 1]
+            nbrs = graph.adj_island[start:end]
+            return list(zip(graph.island_rows[nbrs].tolist(), graph.island_cols[nbrs].tolist()))
+
+        # Empty cell: nearest island in each direction
+        in_col = self.island_rows[self.island_cols == col]
+        in_row = self.island_cols[self.island_rows == row]
         neighbors = []
-        
-        for dr, dc in DIRECTIONS:
-            r, c = row + dr, col + dc
-            
-            while 0 <= r < self.rows and 0 <= c < self.cols:
-                if self.grid[r][c] > 0:
-                    neighbors.append((r, c))
-                    break
-                r += dr
-                c += dc
+        if (in_col < row).any():
+            neighbors.append((int(in_col[in_col < row].max()), col))
+        if (in_col > row).any():
+            neighbors.append((int(in_col[in_col > row].min()), col))
+        if (in_row < col).any():
+            neighbors.append((row, int(in_row[in_row < col].max())))
+        if (in_row > col).any():
+            neighbors.append((row, int(in_row[in_row > col].min())))
         
         return neighbors
-    
+
+    def build_graph(self) -> PuzzleGraph:
+        edge_u, edge_v = discover_edges(self.island_rows, self.island_cols)
+        return PuzzleGraph(self.island_rows, self.island_cols, self.island_values, edge_u, edge_v)
+
     def is_valid_bridge(self, i1: int, j1: int, i2: int, j2: int, 
                        current_state: dict) -> bool:
         for (r1, c1, r2, c2), _ in current_state.items():
@@ -91,116 +510,353 @@ class HashiwokakeroGame:
         else:
             self.display_solution(solution)
     
-    def display_solution(self, solution: dict) -> List[List[str]]:
-        result = [[BRIDGE_SYMBOLS['empty'] for _ in range(self.cols)] 
-                  for _ in range(self.rows)]
-        
-        for i, j, val in self.islands:
-            result[i][j] = str(val)
+    def render_solution(self, solution: dict) -> np.ndarray:
+        """
+        Renders a solution into a (rows, cols) uint8 board of ASCII symbols:
+        one slice assignment per bridge, islands written last.
+        """
+        board = np.full((self.rows, self.cols), ord(BRIDGE_SYMBOLS['empty']), dtype=np.uint8)
         
-        for key, num_bridges in solution.items():
-            i1, j1, i2, j2 = key
-            
+        for (i1, j1, i2, j2), num_bridges in solution.items():
+            double = num_bridges == 2
             if i1 == i2:
-                start_col = min(j1, j2) + 1
-                end_col = max(j1, j2)
-                for c in range(start_col, end_col):
-                    result[i1][c] = BRIDGE_SYMBOLS['h1'] if num_bridges == 1 else BRIDGE_SYMBOLS['h2']
-                        
+                symbol = BRIDGE_SYMBOLS['h2'] if double else BRIDGE_SYMBOLS['h1']
+                board[i1, min(j1, j2) + 1:max(j1, j2)] = ord(symbol)
             else:
-                start_row = min(i1, i2) + 1
-                end_row = max(i1, i2)
-                for r in range(start_row, end_row):
-                    result[r][j1] = BRIDGE_SYMBOLS['v1'] if num_bridges == 1 else BRIDGE_SYMBOLS['v2']
+                symbol = BRIDGE_SYMBOLS['v2'] if double else BRIDGE_SYMBOLS['v1']
+                board[min(i1, i2) + 1:max(i1, i2), j1] = ord(symbol)
+        
+        board[self.island_rows, self.island_cols] = ord('0') + self.island_values
+        return board
+
+    @staticmethod
+    def format_board(board: np.ndarray) -> List[str]:
+        """Output-file lines for a rendered board: ["0", "1", "-", ...] per row."""
+        return ['["' + '", "'.join(row.tobytes().decode('ascii')) + '"]' for row in board]
+
+    def display_solution(self, solution: dict, show: bool = True,
+                         board: Optional[np.ndarray] = None) -> Optional[List[List[str]]]:
+        if not show:
+            return None
+        if board is None:
+            board = self.render_solution(solution)
         
+        result = [list(row.tobytes().decode('ascii')) for row in board]
         for row in result:
             print(row)
         
         return result
     
-    def save_solution(self, solution: dict, filename: str):
-        result = [[BRIDGE_SYMBOLS['empty'] for _ in range(self.cols)] 
-                  for _ in range(self.rows)]
-        
-        for i, j, val in self.islands:
-            result[i][j] = str(val)
-        
-        for key, num_bridges in solution.items():
-            i1, j1, i2, j2 = key
-            
-            if i1 == i2:
-                start_col = min(j1, j2) + 1
-                end_col = max(j1, j2)
-                for c in range(start_col, end_col):
-                    result[i1][c] = BRIDGE_SYMBOLS['h2'] if num_bridges == 2 else BRIDGE_SYMBOLS['h1']
-                    
-            else:
-                start_row = min(i1, i2) + 1
-                end_row = max(i1, i2)
-                for r in range(start_row, end_row):
-                    result[r][j1] = BRIDGE_SYMBOLS['v2'] if num_bridges == 2 else BRIDGE_SYMBOLS['v1']
+    def save_solution(self, solution: dict, filename: str, board: Optional[np.ndarray] = None):
+        if board is None:
+            board = self.render_solution(solution)
         
         with open(filename, 'w') as f:
-            for row in result:
-                f.write('[' + ', '.join(f'"{x}"' for x in row) + ']\n')
+            f.write('\n'.join(self.format_board(board)) + '\n')
  
     def validate_solution(self, solution: dict) -> Tuple[bool, List[str]]:
         """
         Validates the solution against game rules.
+
+        Degrees are counted with bincount, bridges are painted into an
+        occupancy list of cells (a cell painted twice is a crossing, an
+        overlap, or a bridge running over an island) and connectivity is
+        checked with union-find.
         """
         errors = []
+        keys = list(solution.keys())
+        counts = np.fromiter(solution.values(), dtype=np.int64, count=len(keys))
+        bridges = np.array(keys, dtype=np.int64).reshape(-1, 4)
+        r1, c1, r2, c2 = bridges.T
+        ids1 = self._island_index(r1, c1)
+        ids2 = self._island_index(r2, c2)
         
         # Check 1: Bridge count per island
-        bridges_count = {}
-        for island in self.islands:
-            bridges_count[(island[0], island[1])] = 0
-        
-        for (i1, j1, i2, j2), num_bridges in solution.items():
-            bridges_count[(i1, j1)] = bridges_count.get((i1, j1), 0) + num_bridges
-            bridges_count[(i2, j2)] = bridges_count.get((i2, j2), 0) + num_bridges
+        num_islands = len(self.island_values)
+        actual = (np.bincount(ids1[ids1 >= 0], weights=counts[ids1 >= 0], minlength=num_islands) +
+                  np.bincount(ids2[ids2 >= 0], weights=counts[ids2 >= 0], minlength=num_islands))
+        for island in np.flatnonzero(actual != self.island_values).tolist():
+            i, j, required = self.islands[island]
+            errors.append(f"Island ({i},{j}): needs {required} bridges, has {int(actual[island])}")
         
-        for i, j, required in self.islands:
-            actual = bridges_count.get((i, j), 0)
-            if actual != required:
-                errors.append(f"Island ({i},{j}): needs {required} bridges, has {actual}")
-        
-        # Check 2: Crossing bridges
-        bridges_list = list(solution.keys())
-        for idx1 in range(len(bridges_list)):
-            for idx2 in range(idx1 + 1, len(bridges_list)):
-                if self._bridges_cross(bridges_list[idx1], bridges_list[idx2]):
-                    errors.append(f"Bridge {bridges_list[idx1]} crosses {bridges_list[idx2]}")
+        # Check 2: Crossing bridges (cells painted more than once)
+        for kind, a, b in self._painted_conflicts(bridges):
+            if kind == 'island':
+                errors.append(f"Bridge {keys[a]} passes over island {self.islands[b][:2]}")
+            elif kind == 'cross':
+                errors.append(f"Bridge {keys[a]} crosses {keys[b]}")
+            else:
+                errors.append(f"Bridge {keys[a]} overlaps {keys[b]}")
 
         # Check 3: Connectivity
         # The bridges must connect the islands into a single connected group
-        if not self._is_connected(solution):
+        used = (counts > 0) & (ids1 >= 0) & (ids2 >= 0)
+        labels = component_labels(num_islands, zip(ids1[used].tolist(), ids2[used].tolist()))
+        if len(set(labels)) > 1:
              errors.append("Islands are not fully connected (Graph is disconnected)")
         return len(errors) == 0, errors
 
-    def _is_connected(self, solution: dict) -> bool:
-        if not self.islands:
-            return True
-            
-        # Build adjacency list
-        adj = {(r, c): [] for r, c, _ in self.islands}
-        for (r1, c1, r2, c2), count in solution.items():
-            if count > 0:
-                adj[(r1, c1)].append((r2, c2))
-                adj[(r2, c2)].append((r1, c1))
-        
-        # BFS
-        start_node = (self.islands[0][0], self.islands[0][1])
-        queue = [start_node]
-        visited = {start_node}
-        
-        while queue:
-            u = queue.pop(0)
-            for v in adj[u]:
-                if v not in visited:
-                    visited.add(v)
-                    queue.append(v)
-        
-        return len(visited) == len(self.islands)
-    
+    def _island_index(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Island id at each (row, col), or -1 where there is no island."""
+        linear = self.island_rows.astype(np.int64) * self.cols + self.island_cols
+        query = rows * self.cols + cols
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        pos = np.minimum(np.searchsorted(linear, query), max(len(linear) - 1, 0))
+        found = inside & (len(linear) > 0)
+        if len(linear):
+            found &= linear[pos] == query
+        return np.where(found, pos, -1)
+
+    def _painted_conflicts(self, bridges: np.ndarray) -> List[Tuple[str, int, int]]:
+        """
+        Paints the interior cells of every straight bridge and returns the
+        conflicts found on cells painted more than once, sorted by bridge:
+        ('cross', a, b), ('overlap', a, b) or ('island', a, island id).
+        """
+        r1, c1, r2, c2 = bridges.T
+        horizontal = r1 == r2
+        straight = horizontal | (c1 == c2)
+        lo = np.where(horizontal, np.minimum(c1, c2), np.minimum(r1, r2))
+        hi = np.where(horizontal, np.maximum(c1, c2), np.maximum(r1, r2))
+        lengths = np.where(straight, np.maximum(hi - lo - 1, 0), 0)
+
+        owner = np.repeat(np.arange(len(bridges)), lengths)
+        step = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        along = lo[owner] + 1 + step
+        cell_rows = np.where(horizontal[owner], r1[owner], along)
+        cell_cols = np.where(horizontal[owner], along, c1[owner])
+
+        # Islands are painted as owners numbered after the bridges
+        islands = np.arange(len(self.island_values)) + len(bridges)
+        cells = np.concatenate([cell_rows * self.cols + cell_cols,
+                                self.island_rows.astype(np.int64) * self.cols + self.island_cols])
+        owners = np.concatenate([owner, islands])
+
+        order = np.lexsort((owners, cells))
+        cells, owners = cells[order], owners[order]
+        repeated = np.flatnonzero(cells[1:] == cells[:-1])
+        if len(repeated) == 0:
+            return []
+
+        conflicts = set()
+        starts = np.unique(np.concatenate([repeated, repeated + 1]))
+        for cell in np.unique(cells[starts]).tolist():
+            group = owners[np.searchsorted(cells, cell, 'left'):np.searchsorted(cells, cell, 'right')].tolist()
+            for x in range(len(group)):
+                for y in range(x + 1, len(group)):
+                    a, b = group[x], group[y]
+                    if b >= len(bridges):
+                        if a < len(bridges):
+                            conflicts.add(('island', a, b - len(bridges)))
+                    elif horizontal[a] != horizontal[b]:
+                        conflicts.add(('cross', a, b))
+                    else:
+                        conflicts.add(('overlap', a, b))
+        return sorted(conflicts, key=lambda conflict: (conflict[1], conflict[2], conflict[0]))
+
+    def validate_many(self, solutions) -> np.ndarray:
+        """
+        Validity of many candidate solutions at once, as a bool array.
+
+        `solutions` is either a list of {(r1, c1, r2, c2): count} dicts or an
+        (N, num_edges) array of bridge counts in edge-id order. Degree,
+        crossing and connectivity checks run on the whole batch with NumPy;
+        dicts using keys that are not candidate edges go through
+        validate_solution instead.
+        """
+        graph = self.graph
+        valid = np.zeros(len(solutions), dtype=bool)
+        if isinstance(solutions, np.ndarray):
+            matrix = solutions.reshape(len(solutions), graph.num_edges)
+            batch = np.arange(len(solutions))
+        else:
+            matrix = np.zeros((len(solutions), graph.num_edges), dtype=np.int8)
+            batch = []
+            for idx, solution in enumerate(solutions):
+                edge_ids = [graph.edge_id(key) for key in solution]
+                if None in edge_ids:
+                    valid[idx] = self.validate_solution(solution)[0]
+                    continue
+                matrix[idx, edge_ids] = list(solution.values())
+                batch.append(idx)
+            batch = np.array(batch, dtype=np.int64)
+            matrix = matrix[batch]
+
+        # Degrees: scatter each edge's count onto both endpoints
+        degree = np.zeros((graph.num_islands, len(batch)), dtype=np.int64)
+        np.add.at(degree, graph.edge_u, matrix.T)
+        np.add.at(degree, graph.edge_v, matrix.T)
+        ok = (degree == graph.island_values[:, None]).all(axis=0)
+
+        # Crossings: both edges of a conflicting pair carry bridges
+        used = matrix > 0
+        owner = np.repeat(np.arange(graph.num_edges), np.diff(graph.conflict_ptr))
+        first = owner < graph.conflict_edge
+        a, b = owner[first], graph.conflict_edge[first]
+        ok &= ~(used[:, a] & used[:, b]).any(axis=1)
+
+        # Connectivity: min-label propagation with pointer jumping
+        rows = np.flatnonzero(ok)
+        if graph.num_islands and len(rows):
+            edge_used = used[rows]
+            labels = np.tile(np.arange(graph.num_islands), (len(rows), 1))
+            sentinel = graph.num_islands
+            while True:
+                lu = labels[:, graph.edge_u]
+                lv = labels[:, graph.edge_v]
+                low = np.where(edge_used, np.minimum(lu, lv), sentinel)
+                new = labels.T.copy()
+                np.minimum.at(new, graph.edge_u, low.T)
+                np.minimum.at(new, graph.edge_v, low.T)
+                new = new.T
+                new = np.take_along_axis(new, new, axis=1)
+                if np.array_equal(new, labels):
+                    break
+                labels = new
+            ok[rows] = (labels == labels[:, :1]).all(axis=1)
+
+        valid[batch] = ok
+        return valid
+
     def __str__(self):
         return f"Hashiwokakero({self.rows}x{self.cols}, {len(self.islands)} islands)"
+
+
+class SolutionWriter:
+    """
+    Appends many rendered solutions to one buffered output stream, so a
+    batch run writes a single file instead of one small file per puzzle.
+    Each entry is a "# name" header, the board lines (or NO SOLUTION, or
+    UNKNOWN when the solver gave up undecided) and a blank separator line.
+    """
+
+    def __init__(self, target, buffer_size: int = 1 << 20):
+        if hasattr(target, 'write'):
+            self._file, self._owned = target, False
+        else:
+            self._file = open(target, 'w', encoding='utf-8', buffering=buffer_size)
+            self._owned = True
+        self.count = 0
+
+    def write(self, name: str, game: 'HashiwokakeroGame', solution: Optional[dict],
+              board: Optional[np.ndarray] = None, unknown: bool = False):
+        if solution:
+            if board is None:
+                board = game.render_solution(solution)
+            body = '\n'.join(game.format_board(board))
+        else:
+            body = "UNKNOWN" if unknown else "NO SOLUTION"
+        self._file.write(f"# {name}\n{body}\n\n")
+        self.count += 1
+
+    def close(self):
+        if self._owned:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Corpus files: many puzzles in one JSONL file, one puzzle per line:
+#   {"name": "p1", "rows": 7, "cols": 7, "islands": [[r, c, value], ...]}
+# A dense {"name": ..., "grid": [[...], ...]} record is accepted as well.
+# The optional index "<corpus>.idx" holds the byte offset of every line as
+# raw int64 values, for random access and for knowing the corpus size.
+# ---------------------------------------------------------------------------
+
+def game_to_record(name: str, game: HashiwokakeroGame) -> dict:
+    return {
+        'name': name,
+        'rows': game.rows,
+        'cols': game.cols,
+        'islands': [list(island) for island in game.islands],
+    }
+
+
+def game_from_record(record: dict) -> HashiwokakeroGame:
+    if 'grid' in record:
+        return HashiwokakeroGame(grid=record['grid'])
+    return HashiwokakeroGame(shape=(record['rows'], record['cols']), islands=record['islands'])
+
+
+def write_corpus(path: str, entries: Iterable[Tuple[str, HashiwokakeroGame]]) -> int:
+    """Writes (name, game) pairs as a JSONL corpus plus its offset index."""
+    offsets = []
+    with open(path, 'wb') as f:
+        for name, game in entries:
+            offsets.append(f.tell())
+            f.write(json.dumps(game_to_record(name, game), separators=(',', ':')).encode('utf-8'))
+            f.write(b'\n')
+    np.array(offsets, dtype=np.int64).tofile(corpus_index_path(path))
+    return len(offsets)
+
+
+def corpus_index_path(path: str) -> str:
+    return str(path) + '.idx'
+
+
+def build_corpus_index(path: str) -> np.ndarray:
+    offsets = []
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                offsets.append(offset)
+            offset += len(line)
+    index = np.array(offsets, dtype=np.int64)
+    index.tofile(corpus_index_path(path))
+    return index
+
+
+def load_corpus_index(path: str) -> Optional[np.ndarray]:
+    """Offsets from the index file, or None when there is no up-to-date index."""
+    index_path = corpus_index_path(path)
+    if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(path):
+        return None
+    return np.fromfile(index_path, dtype=np.int64)
+
+
+def iter_corpus(path: str, start: int = 0, stop: Optional[int] = None
+                ) -> Iterator[Tuple[str, HashiwokakeroGame]]:
+    """
+    Lazily yields (name, game) for puzzles start..stop-1 of a corpus. Only one
+    record is decoded at a time; with an index the reader seeks straight to
+    `start` instead of scanning the preceding lines.
+    """
+    base = os.path.basename(str(path))
+    with open(path, 'rb') as f:
+        position = 0
+        if start > 0:
+            index = load_corpus_index(path)
+            if index is not None:
+                if start >= len(index):
+                    return
+                f.seek(int(index[start]))
+                position = start
+
+        for line in f:
+            if not line.strip():
+                continue
+            if stop is not None and position >= stop:
+                return
+            if position >= start:
+                record = json.loads(line)
+                yield record.get('name', f"{base}#{position}"), game_from_record(record)
+            position += 1
+
+
+def read_corpus_entry(path: str, position: int) -> Tuple[str, HashiwokakeroGame]:
+    """Random access to a single puzzle; builds the index on first use."""
+    index = load_corpus_index(path)
+    if index is None:
+        index = build_corpus_index(path)
+    with open(path, 'rb') as f:
+        f.seek(int(index[position]))
+        record = json.loads(f.readline())
+    return record.get('name', f"{os.path.basename(str(path))}#{position}"), game_from_record(record)
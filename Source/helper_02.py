@@ -1,305 +1,1136 @@
 import time
-from collections import deque
-from itertools import combinations
-from pysat.solvers import Glucose3
-from typing import Dict, List, Tuple, Set
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from pysat.card import CardEnc, EncType
+from pysat.solvers import Solver, SolverNames
+try:
+    from pysat.engines import Propagator
+except ImportError:  # python-sat without the IPASIR-UP interface
+    Propagator = None
+from typing import Dict, List, Optional, Tuple
+from cnf_cache import CNFCache, import_dimacs
 from helper_01 import HashiwokakeroGame
 
+CONNECTIVITY_MODES = ('lazy', 'tree')
+# 'configs' enumerates neighbor configurations; the rest are pysat.card
+# encodings of the bridge-count sum, and 'pb' is pysat.pb (needs pypblib).
+CAPACITY_ENCODINGS = ('configs', 'seqcounter', 'totalizer', 'sortnetwrk',
+                      'cardnetwrk', 'mtotalizer', 'kmtotalizer', 'pb')
+# 'onehot': exclusive [k=1], [k=2] per edge; 'order': thermometer [x>=1], [x>=2]
+MULTIPLICITY_ENCODINGS = ('onehot', 'order')
+# Clauses handed to a streaming sink at a time
+EMIT_CHUNK_SIZE = 4096
+# pysat-bundled solvers that accept clauses between solve calls (needed for
+# lazy cuts); Kissat is left out for that reason. Older python-sat releases
+# lack some of them, so only the ones the installed version knows are offered.
+SAT_BACKENDS = tuple(name for name in (
+    'glucose3', 'glucose4', 'glucose42', 'gluecard3', 'gluecard4',
+    'cadical103', 'cadical153', 'cadical195', 'cadical300', 'lingeling',
+    'maplechrono', 'maplecm', 'maplesat', 'mergesat3', 'minicard',
+    'minisat22', 'minisatep') if hasattr(SolverNames, name))
+# Backends without solve_limited, hence without conflict limits
+UNLIMITED_BACKENDS = ('lingeling',)
+# Backends with an incremental mode (incr=True)
+INCREMENTAL_BACKENDS = ('glucose3', 'glucose4', 'glucose42', 'gluecard3', 'gluecard4',
+                        'mergesat3')
+# The only pysat backend with external propagators (IPASIR-UP)
+PROPAGATOR_BACKEND = 'cadical195'
+# Backends without set_phases, hence without phase hints
+PHASELESS_BACKENDS = ('cadical103',)
+# Island values a puzzle may hold
+ISLAND_VALUES = range(1, 9)
+
+
 class CNFGenerator:
+    """
+    Builds the CNF for a puzzle. With connectivity='lazy' the formula only
+    holds the local constraints and the solver adds cuts for disconnected
+    models; with connectivity='tree' it also encodes a spanning tree rooted
+    at island 0, so every model is connected.
+
+    Edge e owns variables 2e+1 and 2e+2 (bridge_var(e, 1/2)). With
+    multiplicity='onehot' they mean "exactly k bridges"; with 'order' they
+    mean "at least k bridges", so one literal tells whether an edge is used.
+
+    redundant=True adds implied clauses up front: no 1-1 bridge or 2=2
+    double bridge closing off two islands (unless they are the whole
+    puzzle), and forced bridges around saturated islands.
+
+    selectors=True guards each island's capacity clauses with a selector
+    variable (selector_vars[island]); the constraint only holds when the
+    selector is assumed true, which lets the solver report UNSAT cores.
+
+    all_values=True ignores the island values and encodes every value in
+    ISLAND_VALUES instead, each behind its own selector
+    (value_selectors[island][value]); assuming one selector per island
+    picks the puzzle to solve, so one formula serves every edit of it.
+
+    Setting `formula` to a formula built earlier for the same puzzle and
+    options (a pysat CNF or a cnf_cache.DimacsFormula) makes emit_cnf()
+    replay it instead.
+
+    After emit_cnf(), clause_counts and var_counts split the formula by
+    category: 'crossing', 'mutex', 'capacity', 'redundant', 'tree',
+    'aux' (definitions of "edge used" literals), 'selector' and 'bridge'
+    (variables only). A replayed formula keeps the categories stored with
+    it, or counts as 'replayed' when it has none.
+    """
     
-    def __init__(self, game: HashiwokakeroGame):
+    def __init__(self, game: HashiwokakeroGame, connectivity: str = 'lazy',
+                 capacity: str = 'configs', multiplicity: str = 'onehot',
+                 redundant: bool = False, selectors: bool = False,
+                 all_values: bool = False):
+        if connectivity not in CONNECTIVITY_MODES:
+            raise ValueError(f"Unknown connectivity mode: {connectivity}")
+        if capacity not in CAPACITY_ENCODINGS:
+            raise ValueError(f"Unknown capacity encoding: {capacity}")
+        if multiplicity not in MULTIPLICITY_ENCODINGS:
+            raise ValueError(f"Unknown multiplicity encoding: {multiplicity}")
+        if selectors and all_values:
+            raise ValueError("selectors and all_values are mutually exclusive")
         self.game = game
-        self.variables = {}  # Maps (r1, c1, r2, c2, k) -> int ID
-        self.var_counter = 1
+        self.connectivity = connectivity
+        self.capacity = capacity
+        self.multiplicity = multiplicity
+        self.redundant = redundant
+        self.selectors = selectors
+        self.selector_vars = []
+        self.all_values = all_values
+        self.value_selectors = []
+        self.formula = None
+        self.graph = game.graph
+        # Bridge variables are dense: edge e, k bridges -> 2 * e + k
+        self.num_bridge_vars = 2 * self.graph.num_edges
+        self.var_counter = self.num_bridge_vars + 1
         self.clauses = []
-        self.neighbors_map = {}
-        for r, c, _ in self.game.islands:
-            self.neighbors_map[(r, c)] = self.game.get_neighbors(r, c)
-
-    def _get_var_key(self, r1, c1, r2, c2, k):
-        if (r1, c1) > (r2, c2):
-            return (r2, c2, r1, c1, k)
-        return (r1, c1, r2, c2, k)
-
-    def create_variable(self, i1: int, j1: int, i2: int, j2: int, num_bridges: int) -> int:
-        key = self._get_var_key(i1, j1, i2, j2, num_bridges)
-        if key not in self.variables:
-            self.variables[key] = self.var_counter
-            self.var_counter += 1
-        return self.variables[key]
+        self.num_clauses = 0
+        self.clause_counts = {}
+        self.var_counts = {}
+        self._category = None
+        self._used_vars = {}
+        self._sink = None
+        self._chunk_size = EMIT_CHUNK_SIZE
+        self._buffer = []
+        self._guard = []
+
+    def bridge_var(self, edge: int, num_bridges: int) -> int:
+        return 2 * edge + num_bridges
+
+    def used_literals(self, edge: int) -> List[int]:
+        """Literals of which at least one is true iff the edge carries a bridge."""
+        if self.multiplicity == 'order':
+            return [self.bridge_var(edge, 1)]
+        return [self.bridge_var(edge, 1), self.bridge_var(edge, 2)]
+
+    def count_literals(self, edge: int) -> List[int]:
+        """Literals whose number of true ones equals the edge's bridge count."""
+        if self.multiplicity == 'order':
+            return [self.bridge_var(edge, 1), self.bridge_var(edge, 2)]
+        used = self._used_vars.get(edge)
+        if used is None:
+            # used <-> (k=1 or k=2); with the mutex, used + [k=2] is the count
+            category, self._category = self._category, 'aux'
+            used = self._used_vars[edge] = self.new_variable()
+            one, two = self.bridge_var(edge, 1), self.bridge_var(edge, 2)
+            # A definition, shared by both islands: never behind a selector
+            guard, self._guard = self._guard, []
+            self._emit_many([[-used, one, two], [used, -one], [used, -two]])
+            self._guard = guard
+            self._category = category
+        return [used, self.bridge_var(edge, 2)]
+
+    def new_variable(self) -> int:
+        var = self.var_counter
+        self.var_counter += 1
+        self.var_counts[self._category] = self.var_counts.get(self._category, 0) + 1
+        return var
     
-    def generate_cnf(self) -> Tuple[List[List[int]], Dict]:
-        self.clauses = []
-        self._create_variables()
-        self._add_crossing_constraints()
-        self._add_mutex_constraints()
-        
-        if not self._add_island_capacity_constraints():
-            return None, self.variables
+    def generate_cnf(self) -> Optional[List[List[int]]]:
+        """All clauses as one list, or None on a local conflict."""
+        clauses = []
+        if not self.emit_cnf(clauses.extend):
+            return None
+        self.clauses = clauses
+        return clauses
+
+    def emit_cnf(self, sink, chunk_size: int = EMIT_CHUNK_SIZE) -> bool:
+        """
+        Streams the clauses to `sink` (e.g. a solver's append_formula) in
+        chunks of `chunk_size` instead of keeping them. Returns False on a
+        local conflict; clauses already emitted are then meaningless. With
+        selectors a local conflict only falsifies that island's selector.
+        """
+        self.var_counter = self.num_bridge_vars + 1
+        self.num_clauses = 0
+        self.clause_counts = {}
+        self.var_counts = {'bridge': self.num_bridge_vars}
+        self.selector_vars = []
+        self.value_selectors = []
+        self._used_vars = {}
+        self._guard = []
+        self._sink = sink
+        self._chunk_size = chunk_size
+        self._buffer = []
+        try:
+            if self.formula is not None:
+                self._category = 'replayed'
+                self._add_vars(self.formula.nv + 1)
+                # A local conflict is stored as the empty clause
+                conflict = False
+                for clause in self.formula.clauses:
+                    conflict = conflict or not clause
+                    self._emit(clause)
+                self._flush()
+                if getattr(self.formula, 'clause_counts', None) is not None:
+                    self.clause_counts = dict(self.formula.clause_counts)
+                    self.var_counts = dict(self.formula.var_counts)
+                return not conflict
+            self._category = 'crossing'
+            self._add_crossing_constraints()
+            self._category = 'mutex'
+            self._add_mutex_constraints()
             
-        return self.clauses, self.variables
-    
-    def _create_variables(self):
-        for (r, c), neighbors in self.neighbors_map.items():
-            for nr, nc in neighbors:
-                if (r, c) < (nr, nc):
-                    self.create_variable(r, c, nr, nc, 1)
-                    self.create_variable(r, c, nr, nc, 2)
+            self._category = 'capacity'
+            if not self._add_island_capacity_constraints():
+                return False
+            if self.redundant:
+                self._category = 'redundant'
+                self._add_redundant_constraints()
+            if self.connectivity == 'tree':
+                self._category = 'tree'
+                self._add_tree_constraints()
+            self._flush()
+            return True
+        finally:
+            self._sink = None
+            self._buffer = []
+            self._guard = []
+            self._category = None
+
+    def _emit(self, clause: List[int]):
+        if self._guard:
+            clause = clause + self._guard
+        self._buffer.append(clause)
+        self.clause_counts[self._category] = self.clause_counts.get(self._category, 0) + 1
+        if len(self._buffer) >= self._chunk_size:
+            self._flush()
+
+    def _emit_many(self, clauses: List[List[int]]):
+        for clause in clauses:
+            self._emit(clause)
+
+    def _flush(self):
+        if self._buffer:
+            self.num_clauses += len(self._buffer)
+            self._sink(self._buffer)
+            self._buffer = []
+
+    def decode(self, model: List[int]) -> Dict[int, int]:
+        """Bridge counts per edge id from a solver model (same test for both multiplicities)."""
+        solution = {}
+        for edge in range(self.graph.num_edges):
+            if model[2 * edge + 1] > 0:
+                solution[edge] = 2
+            elif model[2 * edge] > 0:
+                solution[edge] = 1
+        return solution
 
     def _add_mutex_constraints(self):
-        seen = set()
-        for (r1, c1, r2, c2, k), _ in self.variables.items():
-            pair = (r1, c1, r2, c2)
-            if pair in seen: continue
-            seen.add(pair)
-            v1 = self.variables.get((r1, c1, r2, c2, 1))
-            v2 = self.variables.get((r1, c1, r2, c2, 2))
-            if v1 and v2: self.clauses.append([-v1, -v2])
+        for edge in range(self.graph.num_edges):
+            if self.multiplicity == 'order':
+                # x>=2 -> x>=1
+                self._emit([-self.bridge_var(edge, 2), self.bridge_var(edge, 1)])
+            else:
+                self._emit([-self.bridge_var(edge, 1), -self.bridge_var(edge, 2)])
 
     def _add_crossing_constraints(self):
-        connections = []
-        seen = set()
-        for (r1, c1, r2, c2, k) in self.variables:
-            pair = (r1, c1, r2, c2)
-            if pair not in seen:
-                connections.append(pair)
-                seen.add(pair)
-        
-        for i in range(len(connections)):
-            for j in range(i + 1, len(connections)):
-                if self._bridges_cross(connections[i], connections[j]):
-                    pair1 = connections[i]
-                    pair2 = connections[j]
-                    vars1 = [self.variables.get(pair1 + (k,)) for k in [1, 2]]
-                    vars2 = [self.variables.get(pair2 + (k,)) for k in [1, 2]]
-                    for v1 in vars1:
-                        for v2 in vars2:
-                            if v1 and v2: self.clauses.append([-v1, -v2])
-
-    def _bridges_cross(self, b1, b2):
-        r1a, c1a, r2a, c2a = b1
-        r1b, c1b, r2b, c2b = b2
-        is_h1 = (r1a == r2a)
-        is_h2 = (r1b == r2b)
-        if is_h1 == is_h2: return False
-        if is_h1:
-            return (min(c1a, c2a) < c1b < max(c1a, c2a)) and \
-                   (min(r1b, r2b) < r1a < max(r1b, r2b))
-        else:
-            return (min(c1b, c2b) < c1a < max(c1b, c2b)) and \
-                   (min(r1a, r2a) < r1b < max(r1a, r2a))
+        order = self.multiplicity == 'order'
+        for i, crossing in enumerate(self.graph.conflicts()):
+            for j in crossing:
+                if j > i:
+                    if order:
+                        self._emit([-self.bridge_var(i, 1), -self.bridge_var(j, 1)])
+                        continue
+                    for k1 in (1, 2):
+                        for k2 in (1, 2):
+                            self._emit([-self.bridge_var(i, k1), -self.bridge_var(j, k2)])
 
     def _add_island_capacity_constraints(self):
-        for r, c, val in self.game.islands:
-            neighbors = self.neighbors_map.get((r, c), [])
+        incident = self.graph.incident()
+        if self.all_values:
+            for island in range(self.graph.num_islands):
+                self._add_all_value_capacity([edge for edge, _ in incident[island]])
+            return True
+        if self.selectors:
+            self._category = 'selector'
+            self.selector_vars = [self.new_variable() for _ in range(self.graph.num_islands)]
+            self._category = 'capacity'
+        for island, val in enumerate(self.graph.island_values.tolist()):
+            edges = [edge for edge, _ in incident[island]]
+            self._guard = [-self.selector_vars[island]] if self.selectors else []
             # Quick check: if max capacity < required value -> impossible
-            if len(neighbors) * 2 < val: return False
+            if len(edges) * 2 < val or (self.capacity == 'configs'
+                                        and not config_patterns(len(edges), val)):
+                if not self.selectors:
+                    return False
+                self._emit([])  # just the guard: this island alone is UNSAT
+                continue
             
-            valid_configs = self._generate_configs(neighbors, val)
-            if not valid_configs: return False
+            if self.capacity != 'configs':
+                self._add_capacity_sum(edges, val)
+                continue
+            
+            patterns = config_patterns(len(edges), val)
             
             config_vars = []
-            for config in valid_configs:
-                c_var = self.var_counter; self.var_counter += 1
+            for pattern in patterns:
+                c_var = self.new_variable()
                 config_vars.append(c_var)
-                config_dict = {(nr, nc): count for nr, nc, count in config}
-                for nr, nc in neighbors:
-                    count = config_dict.get((nr, nc), 0)
-                    if count > 0:
-                        b_var = self.create_variable(r, c, nr, nc, count)
-                        self.clauses.append([-c_var, b_var])
-                    else:
-                        v1 = self.variables.get(self._get_var_key(r, c, nr, nc, 1))
-                        v2 = self.variables.get(self._get_var_key(r, c, nr, nc, 2))
-                        if v1: self.clauses.append([-c_var, -v1])
-                        if v2: self.clauses.append([-c_var, -v2])
+                self._add_config(c_var, edges, pattern)
             
             # Must choose exactly one config
-            self.clauses.append(config_vars) # At least one
+            self._emit(config_vars) # At least one
             # At most one
             for i in range(len(config_vars)):
                 for j in range(i + 1, len(config_vars)):
-                    self.clauses.append([-config_vars[i], -config_vars[j]])
+                    self._emit([-config_vars[i], -config_vars[j]])
+        self._guard = []
         return True
 
-    def _generate_configs(self, neighbors, target_sum):
-        results = []
-        def backtrack(idx, current_sum, current_config):
-            if current_sum > target_sum: return
-            if idx == len(neighbors):
-                if current_sum == target_sum: results.append(list(current_config))
+    def _add_all_value_capacity(self, edges: List[int]):
+        """One island's capacity for every value, each behind its selector."""
+        self._category = 'selector'
+        selectors = {value: self.new_variable() for value in ISLAND_VALUES}
+        self._category = 'capacity'
+        self.value_selectors.append(selectors)
+        for value, selector in selectors.items():
+            self._guard = [-selector]
+            if self.capacity != 'configs':
+                if value > 2 * len(edges):
+                    self._emit([])
+                else:
+                    self._add_capacity_sum(edges, value)
+                continue
+            # Configs grouped by sum; two configs always differ on some edge,
+            # so they exclude each other without at-most-one clauses
+            config_vars = []
+            for pattern in config_patterns(len(edges), value):
+                c_var = self.new_variable()
+                config_vars.append(c_var)
+                self._guard = []
+                self._add_config(c_var, edges, pattern)
+            self._guard = [-selector]
+            self._emit(config_vars)
+        self._guard = []
+
+    def _add_config(self, c_var: int, edges: List[int], pattern: Tuple[int, ...]):
+        """c_var -> each edge carries the pattern's bridge count."""
+        for edge, count in zip(edges, pattern):
+            if self.multiplicity == 'order':
+                # x>=2 -> x>=1 fixes the rest of the thermometer
+                if count < 2:
+                    self._emit([-c_var, -self.bridge_var(edge, count + 1)])
+                if count > 0:
+                    self._emit([-c_var, self.bridge_var(edge, count)])
+            elif count > 0:
+                self._emit([-c_var, self.bridge_var(edge, count)])
+            else:
+                self._emit([-c_var, -self.bridge_var(edge, 1)])
+                self._emit([-c_var, -self.bridge_var(edge, 2)])
+
+    def _value_guard(self, island: int, value: int) -> Optional[List[int]]:
+        """Guard of a clause implied by the island holding `value`; None if it cannot."""
+        if self.all_values:
+            selector = self.value_selectors[island].get(value)
+            return None if selector is None else [-selector]
+        if self.graph.island_values[island] != value:
+            return None
+        return [-self.selector_vars[island]] if self.selectors else []
+
+    def _add_redundant_constraints(self):
+        # Implied by the capacities involved, so guarded by their selectors
+        if self.graph.num_islands > 2:
+            for edge, (u, v) in enumerate(self.graph.endpoints()):
+                ones = self._value_guard(u, 1), self._value_guard(v, 1)
+                if None not in ones:
+                    # A lone 1-1 bridge would be a closed component
+                    self._guard = ones[0] + ones[1]
+                    for lit in self.used_literals(edge):
+                        self._emit([-lit])
+                twos = self._value_guard(u, 2), self._value_guard(v, 2)
+                if None not in twos:
+                    self._guard = twos[0] + twos[1]
+                    self._emit([-self.bridge_var(edge, 2)])
+
+        incident = self.graph.incident()
+        for island in range(self.graph.num_islands):
+            edges = [edge for edge, _ in incident[island]]
+            full = self._value_guard(island, 2 * len(edges))
+            if full is not None:
+                self._guard = full
+                for edge in edges:
+                    self._emit([self.bridge_var(edge, 2)])
+            near = self._value_guard(island, 2 * len(edges) - 1)
+            if near is not None:
+                self._guard = near
+                for edge in edges:
+                    self._emit(self.used_literals(edge))
+        self._guard = []
+
+    def _add_capacity_sum(self, edges: List[int], val: int):
+        """Bridge count sum == val through a cardinality or pseudo-Boolean encoding."""
+        if self.capacity == 'pb':
+            try:
+                from pysat.pb import PBEnc
+            except (ImportError, AssertionError):
+                raise ValueError("capacity='pb' requires the pypblib package") from None
+            lits = [self.bridge_var(edge, k) for edge in edges for k in (1, 2)]
+            weights = [1, 1 if self.multiplicity == 'order' else 2] * len(edges)
+            encoded = PBEnc.equals(lits=lits, weights=weights, bound=val,
+                                   top_id=self.var_counter - 1)
+        else:
+            # count_literals() may number new "used" variables: read top_id after it
+            lits = [lit for edge in edges for lit in self.count_literals(edge)]
+            encoded = CardEnc.equals(lits=lits, bound=val, top_id=self.var_counter - 1,
+                                     encoding=getattr(EncType, self.capacity))
+        self._emit_many(encoded.clauses)
+        self._add_vars(encoded.nv + 1)
+
+    def _add_vars(self, var_counter: int):
+        """Moves var_counter past variables numbered outside new_variable()."""
+        if var_counter > self.var_counter:
+            self.var_counts[self._category] = (self.var_counts.get(self._category, 0)
+                                               + var_counter - self.var_counter)
+            self.var_counter = var_counter
+
+    def _add_tree_constraints(self):
+        """
+        Every island except the root picks a parent across a used edge, and
+        a parent's level (binary, most significant bit first) must be lower
+        than its child's. Levels rule out cycles, so parent links form a
+        tree reaching the root; BFS depths show a connected solution always
+        has such levels.
+        """
+        n = self.graph.num_islands
+        if n <= 1:
+            return
+        bits = max(1, (n - 1).bit_length())
+        levels = [[self.new_variable() for _ in range(bits)] for _ in range(n)]
+
+        parents = [[] for _ in range(n)]
+        for edge, (u, v) in enumerate(self.graph.endpoints()):
+            used = self.used_literals(edge)
+            for child, parent in ((u, v), (v, u)):
+                if child == 0:
+                    continue
+                arc = self.new_variable()
+                parents[child].append(arc)
+                self._emit([-arc] + used)
+                self._add_less_than(arc, levels[parent], levels[child])
+
+        for child in range(1, n):
+            self._emit(parents[child])
+
+    def _add_less_than(self, guard: int, a: List[int], b: List[int]):
+        """guard -> a < b, with one selector per bit for the first differing position."""
+        selectors = []
+        for k in range(len(a)):
+            d = self.new_variable()
+            selectors.append(d)
+            self._emit([-d, -a[k]])
+            self._emit([-d, b[k]])
+            for j in range(k):
+                self._emit([-d, -a[j], b[j]])
+                self._emit([-d, a[j], -b[j]])
+        self._emit([-guard] + selectors)
+
+
+@lru_cache(maxsize=None)
+def config_patterns(degree: int, target_sum: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Every way to give `degree` edges 0, 1 or 2 bridges summing to
+    target_sum, as per-position counts. Depends only on (degree, value), so
+    islands of the same shape share one enumeration.
+    """
+    results = []
+    current = []
+
+    def backtrack(idx, current_sum):
+        if current_sum > target_sum: return
+        if idx == degree:
+            if current_sum == target_sum: results.append(tuple(current))
+            return
+        for count in (0, 1, 2):
+            current.append(count)
+            backtrack(idx + 1, current_sum + count)
+            current.pop()
+
+    backtrack(0, 0)
+    return tuple(results)
+
+
+class ConnectivityPropagator(Propagator or object):
+    """
+    External propagator for CaDiCaL 1.9.5 that watches the "edge used"
+    literals. Whenever the edges not yet ruled out split the islands, it
+    hands the solver the cut of one side as a clause (all of its literals
+    are false, so the solver backtracks at once), and it rejects complete
+    models that are disconnected in the same way.
+    """
+
+    def __init__(self, cnf_gen: CNFGenerator):
+        super().__init__()
+        self.graph = cnf_gen.graph
+        self.cnf_gen = cnf_gen
+        self.literals = [cnf_gen.used_literals(e) for e in range(self.graph.num_edges)]
+        self.var_edge = {lit: e for e, lits in enumerate(self.literals) for lit in lits}
+        # Number of an edge's used literals currently false; dead when all are
+        self.false_count = [0] * self.graph.num_edges
+        self.fixed = set()
+        self.trail = []
+        self.levels = []
+        self.dirty = False
+        self.pending = []
+        self.num_clauses = 0
+
+    def observed_vars(self) -> List[int]:
+        return list(self.var_edge)
+
+    def on_assignment(self, lit: int, fixed: bool = False) -> None:
+        var = abs(lit)
+        if fixed:
+            # Root-level assignments survive backtracking
+            if var in self.fixed:
                 return
-            nr, nc = neighbors[idx]
-            # Option 0 bridges
-            backtrack(idx + 1, current_sum, current_config)
-            # Option 1 bridge
-            current_config.append((nr, nc, 1))
-            backtrack(idx + 1, current_sum + 1, current_config)
-            current_config.pop()
-            # Option 2 bridges
-            current_config.append((nr, nc, 2))
-            backtrack(idx + 1, current_sum + 2, current_config)
-            current_config.pop()
-        backtrack(0, 0, [])
-        return results
+            self.fixed.add(var)
+            if var in self.trail:
+                return
+        elif lit < 0:
+            self.trail.append(var)
+        if lit < 0:
+            self.false_count[self.var_edge[var]] += 1
+            self.dirty = True
+
+    def on_new_level(self) -> None:
+        self.levels.append(len(self.trail))
+
+    def on_backtrack(self, to: int) -> None:
+        if to >= len(self.levels):
+            return
+        start = self.levels[to]
+        for var in self.trail[start:]:
+            if var not in self.fixed:
+                self.false_count[self.var_edge[var]] -= 1
+        del self.trail[start:]
+        del self.levels[to:]
+
+    def check_model(self, model: List[int]) -> bool:
+        # The model lists the observed literals only
+        true = {lit for lit in model if lit > 0}
+        used = [e for e, lits in enumerate(self.literals) if any(lit in true for lit in lits)]
+        return not self._queue_cut(used)
+
+    def decide(self) -> int:
+        return 0
+
+    def propagate(self) -> List[int]:
+        if self.dirty:
+            self.dirty = False
+            alive = [e for e, lits in enumerate(self.literals) if self.false_count[e] < len(lits)]
+            self._queue_cut(alive)
+        return []
+
+    def provide_reason(self, lit: int) -> List[int]:
+        return []
+
+    def has_clause(self) -> bool:
+        return bool(self.pending)
+
+    def add_clause(self) -> List[int]:
+        return self.pending.pop()
+
+    def _queue_cut(self, edges: List[int]) -> bool:
+        """Queues one cut clause if `edges` leave the islands disconnected."""
+        if self.pending:
+            return True
+        labels = self.graph.components(edges)
+        if len(set(labels)) <= 1:
+            return False
+        cut = min(self.graph.component_cuts(labels), key=len)
+        self.pending.append([lit for edge in cut for lit in self.literals[edge]])
+        self.num_clauses += 1
+        return True
+
+
+@dataclass
+class SolveStats:
+    """
+    Breakdown of a PySATSolver run (solve, solutions or backbone). Times
+    are in seconds: CNF generation, handing clauses to the backend, phase
+    hints, SAT calls, connectivity checks with their cuts, and the
+    failure diagnosis of an UNSAT solve (part of total_time). Formula
+    sizes are split by category as in CNFGenerator; `solver` holds the
+    backend's accum_stats() (conflicts, decisions, propagations, restarts).
+    """
+    generate_time: float = 0.0
+    load_time: float = 0.0
+    hint_time: float = 0.0
+    sat_time: float = 0.0
+    connectivity_time: float = 0.0
+    diagnose_time: float = 0.0
+    total_time: float = 0.0
+    num_vars: int = 0
+    num_clauses: int = 0
+    vars_by_category: Dict[str, int] = field(default_factory=dict)
+    clauses_by_category: Dict[str, int] = field(default_factory=dict)
+    sat_calls: int = 0
+    iterations: int = 0
+    num_cuts: int = 0
+    solver: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
 
 
 class PySATSolver:
-    def __init__(self, game: HashiwokakeroGame):
+    """
+    SAT-based solver. `backend` is any name in SAT_BACKENDS; `conflict_limit`
+    caps the conflicts of each SAT call (status becomes 'UNKNOWN' when hit)
+    and `incremental` turns on the backend's incremental mode (Glucose,
+    Gluecard and MergeSat only). `propagator=True` attaches a
+    ConnectivityPropagator, which needs backend='cadical195'.
+    `phase_hints=True` sets the solver's preferred phases from the forced
+    bridges and a greedy pass of the backtracking heuristic (see
+    hint_assignment); phases only steer the search. `cnf_cache`
+    is a CNFCache directory: the formula is read from it when stored there,
+    and stored after generating it otherwise. `find_core=True` makes the
+    diagnosis of an UNSAT solve minimize an UNSAT core (see unsat_core) when
+    the cheap checks find no cause; it costs a connected solve per island.
+    `stats` is the SolveStats of the last run.
+    """
+
+    def __init__(self, game: HashiwokakeroGame, connectivity: str = 'lazy',
+                 capacity: str = 'configs', multiplicity: str = 'onehot',
+                 backend: str = 'glucose3', conflict_limit: Optional[int] = None,
+                 incremental: bool = False, propagator: bool = False,
+                 redundant: bool = False, phase_hints: bool = False,
+                 cnf_cache: Optional[str] = None, find_core: bool = False):
+        if backend not in SAT_BACKENDS:
+            raise ValueError(f"Unknown SAT backend: {backend}")
+        if conflict_limit is not None and conflict_limit <= 0:
+            raise ValueError("conflict_limit must be positive")
+        if conflict_limit is not None and backend in UNLIMITED_BACKENDS:
+            raise ValueError(f"SAT backend {backend} does not support conflict limits")
+        if incremental and backend not in INCREMENTAL_BACKENDS:
+            raise ValueError(f"SAT backend {backend} does not support incremental mode")
+        if propagator and (backend != PROPAGATOR_BACKEND or Propagator is None):
+            raise ValueError(f"The connectivity propagator needs backend {PROPAGATOR_BACKEND} "
+                             f"and a python-sat with pysat.engines")
+        if phase_hints and backend in PHASELESS_BACKENDS:
+            raise ValueError(f"SAT backend {backend} does not support phase hints")
         self.game = game
-        self.cnf_gen = CNFGenerator(game)
+        self.graph = game.graph
+        self.cnf_gen = CNFGenerator(game, connectivity, capacity, multiplicity, redundant)
+        self.backend = backend
+        self.conflict_limit = conflict_limit
+        self.incremental = incremental
+        self.propagator = propagator
+        self.phase_hints = phase_hints
+        self.cnf_cache = CNFCache(cnf_cache) if cnf_cache else None
+        self.find_core = find_core
+        self._propagator = None
+        self._model = None
+        self.core = None
+        self.status = None
+        self.iterations = 0
+        self.num_cuts = 0
+        self.stats = SolveStats()
+
+    @classmethod
+    def from_dimacs(cls, path: str, **options) -> 'PySATSolver':
+        """
+        A solver replaying a formula written by cnf_cache.export_dimacs(),
+        with the puzzle and encoding options of its sidecar; `options` are
+        the remaining PySATSolver arguments (backend, conflict_limit, ...).
+        """
+        game, encoding, formula = import_dimacs(path)
+        solver = cls(game, **encoding, **options)
+        solver.cnf_gen.formula = formula
+        return solver
         
     def solve(self) -> Tuple[dict, float]:
-        print("Solving with PySAT (Glucose3)...")
+        print(f"Solving with PySAT ({self.backend}, {self.cnf_gen.connectivity} connectivity, "
+              f"{self.cnf_gen.capacity} capacity, {self.cnf_gen.multiplicity} multiplicity"
+              f"{', redundant pack' if self.cnf_gen.redundant else ''}"
+              f"{', phase hints' if self.phase_hints else ''})...")
         start_time = time.perf_counter()
+        self.status = None
+        self.num_cuts = 0
+        self.stats = SolveStats()
         
-        # 1. Generate CNF
-        result = self.cnf_gen.generate_cnf()
-        if result is None:
-            solve_time = time.perf_counter() - start_time
+        # 1. Generate CNF straight into the solver, in chunks (never held as one list)
+        solver = self._load_solver()
+        if solver is None:
+            self.status = 'UNSAT'
+            solve_time = self._stop_clock(start_time)
             print(f"  UNSAT (Local Conflict Detected in Generator) ({solve_time:.4f}s)")
             self.diagnose_failure(connectivity_failed=False)
-            return None, solve_time
+            return None, self.stats.total_time
 
-        clauses, variables = result
-        if not clauses:
-            return None, time.perf_counter() - start_time
-            
-        solver = Glucose3()
-        for c in clauses: 
-            solver.add_clause(c)
+        if self.cnf_gen.num_clauses == 0:
+            self._release_solver(solver)
+            self.status = 'UNSAT'
+            return None, self._stop_clock(start_time)
+        print(f"  CNF: {self.cnf_gen.var_counter - 1} vars, {self.cnf_gen.num_clauses} clauses "
+              f"({time.perf_counter() - start_time:.4f}s)")
         
-        # 2. Iterative Solving (Connectivity Check Loop)
-        max_attempts = 100
-        attempt = 0
-        bridge_var_ids = set(variables.values())
+        # 2. Lazy connectivity: refine with cut clauses until connected or UNSAT
+        solution = self._solve_connected(solver)
+        self._release_solver(solver)
+        solve_time = self._stop_clock(start_time)
         
-        while solver.solve() and attempt < max_attempts:
-            attempt += 1
-            model = solver.get_model()
-            solution = self._extract_solution(model, variables)
-            
-            # Check Connectivity
-            if self._is_connected(solution):
-                solve_time = time.perf_counter() - start_time
-                print(f"  SAT Found (Connected) - Attempt {attempt} ({solve_time:.4f}s)")
-                return solution, solve_time
-            
-            # Blocking Clause
-            blocking_clause = [-lit for lit in model if abs(lit) in bridge_var_ids]
-            solver.add_clause(blocking_clause)
-            
-            if attempt <= 5 or attempt % 10 == 0:
-                print(f"    Attempt {attempt}: Disconnected solution found. Retrying...")
+        if self.status == 'UNKNOWN':
+            print(f"  UNKNOWN (Conflict limit {self.conflict_limit} reached, "
+                  f"{self.iterations} iterations) ({solve_time:.4f}s)")
+            return None, solve_time
         
-        solve_time = time.perf_counter() - start_time
+        if solution is not None:
+            print(f"  SAT Found (Connected) - Iteration {self.iterations}, "
+                  f"{self.num_cuts} cuts ({solve_time:.4f}s)")
+            return self.graph.to_solution(solution), solve_time
         
-        if attempt == 0:
+        if self.iterations == 0 and self.num_cuts == 0:
             print(f"  UNSAT (Basic Constraints Unsatisfiable) ({solve_time:.4f}s)")
-            self.diagnose_failure(connectivity_failed=False) 
+            self.diagnose_failure(connectivity_failed=False)
         else:
-            print(f"  UNSAT (No connected solution found after {attempt} attempts) ({solve_time:.4f}s)")
+            print(f"  UNSAT (No connected solution, {self.iterations} iterations, "
+                  f"{self.num_cuts} cuts) ({solve_time:.4f}s)")
             self.diagnose_failure(connectivity_failed=True)
             
-        return None, solve_time
+        return None, self.stats.total_time
+
+    def solutions(self):
+        """
+        Yields every connected solution as {(r1, c1, r2, c2): count}, one at
+        a time, from a single incremental solver. After each one only its
+        bridge assignment is blocked; connectivity cuts stay valid and are
+        kept across solutions.
+        """
+        start_time = time.perf_counter()
+        self.status = None
+        self.num_cuts = 0
+        self.stats = SolveStats()
+        solver = self._load_solver()
+        if solver is None:
+            self.status = 'UNSAT'
+            self._stop_clock(start_time)
+            return
+        try:
+            while True:
+                solution = self._solve_connected(solver)
+                if solution is None:
+                    return
+                yield self.graph.to_solution(solution)
+                # Bridge variables come first; auxiliary variables are left free
+                solver.add_clause([-lit for lit in self._model[:self.cnf_gen.num_bridge_vars]])
+        finally:
+            self._release_solver(solver)
+            self._stop_clock(start_time)
+
+    def is_unique(self) -> bool:
+        """True iff the puzzle has exactly one solution; stops at the second."""
+        found = self.solutions()
+        try:
+            unique = next(found, None) is not None and next(found, None) is None
+        finally:
+            found.close()
+        if self.status == 'UNKNOWN':
+            raise RuntimeError("Conflict limit reached before uniqueness was decided")
+        return unique
+
+    def backbone(self) -> Optional[Dict[Tuple[int, int, int, int], int]]:
+        """
+        Bridge counts shared by every connected solution, as
+        {(r1, c1, r2, c2): count}; count 0 means the edge never carries a
+        bridge. None if the puzzle has no solution.
+
+        The bridge literals of a first model are the candidates. Each one
+        is probed by solving under its negation on the same solver: UNSAT
+        makes it part of the backbone (kept as a unit clause), while a new
+        model drops every candidate it disagrees with.
+        """
+        start_time = time.perf_counter()
+        self.status = None
+        self.num_cuts = 0
+        self.stats = SolveStats()
+        solver = self._load_solver()
+        if solver is None:
+            self.status = 'UNSAT'
+            self._stop_clock(start_time)
+            return None
+        num_vars = self.cnf_gen.num_bridge_vars
+        try:
+            first = self._solve_connected(solver, verbose=False)
+            if first is None:
+                if self.status == 'UNKNOWN':
+                    raise RuntimeError("Conflict limit reached before the backbone was decided")
+                return None
+            first_lits = self._model[:num_vars]
+            candidates = set(first_lits)
+            forced = set()
+            while candidates:
+                lit = candidates.pop()
+                if self._refutes(solver, [-lit]):
+                    forced.add(lit)
+                    solver.add_clause([lit])
+                elif self.status == 'UNKNOWN':
+                    raise RuntimeError("Conflict limit reached before the backbone was decided")
+                else:
+                    candidates.intersection_update(self._model[:num_vars])
+        finally:
+            self._release_solver(solver)
+            self._stop_clock(start_time)
+        self.status = 'SAT'
+        # Both variables of an edge fixed -> its count is the first model's
+        return {self.graph.edge_key(edge): first.get(edge, 0)
+                for edge in range(self.graph.num_edges)
+                if first_lits[2 * edge] in forced and first_lits[2 * edge + 1] in forced}
+
+    def _solve_connected(self, solver, assumptions: List[int] = (),
+                         verbose: bool = True) -> Optional[Dict[int, int]]:
+        """
+        Solves until a model is connected. Each disconnected model adds, for
+        every component, a clause requiring some candidate edge leaving it to
+        be used. Such a clause holds in every connected solution, so the
+        loop needs no attempt cap and an UNSAT answer is exact. Returns
+        {edge id: count} or None; cuts stay in the solver for later calls.
+        """
+        self.iterations = 0
+        while True:
+            result = self._run(solver, assumptions)
+            if result is None:
+                self.status = 'UNKNOWN'
+                return None
+            if not result:
+                break
+            started = time.perf_counter()
+            self.iterations += 1
+            self.stats.iterations += 1
+            self._model = solver.get_model()
+            solution = self._extract_solution(self._model)
+            labels = self.graph.components(e for e, k in solution.items() if k > 0)
+            if len(set(labels)) <= 1:
+                self.status = 'SAT'
+                self.stats.connectivity_time += time.perf_counter() - started
+                return solution
+
+            cuts = self.graph.component_cuts(labels)
+            if verbose and (self.iterations <= 5 or self.iterations % 10 == 0):
+                print(f"    Iteration {self.iterations}: {len(set(labels))} components, "
+                      f"adding {len(cuts)} cuts...")
+            for cut in cuts:
+                if not cut:
+                    # A component with no candidate edges out can never join the rest
+                    self.status = 'UNSAT'
+                    self.stats.connectivity_time += time.perf_counter() - started
+                    return None
+                solver.add_clause([lit for edge in cut for lit in self.cnf_gen.used_literals(edge)])
+                self.num_cuts += 1
+                self.stats.num_cuts += 1
+            self.stats.connectivity_time += time.perf_counter() - started
+        self.status = 'UNSAT'
+        return None
+
+    def _new_solver(self) -> Solver:
+        return Solver(name=self.backend, incr=self.incremental)
+
+    def _load_solver(self) -> Optional[Solver]:
+        """A new solver holding the CNF (and propagator); None on a local conflict."""
+        solver = self._new_solver()
+        load_time = 0.0
+
+        def sink(clauses):
+            nonlocal load_time
+            started = time.perf_counter()
+            solver.append_formula(clauses)
+            load_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        if self.cnf_cache is not None:
+            loaded = self.cnf_cache.emit(self.cnf_gen, sink)
+        else:
+            loaded = self.cnf_gen.emit_cnf(sink)
+        stats = self.stats
+        stats.generate_time += time.perf_counter() - started - load_time
+        stats.load_time += load_time
+        stats.num_vars = self.cnf_gen.var_counter - 1
+        stats.num_clauses = self.cnf_gen.num_clauses
+        stats.vars_by_category = dict(self.cnf_gen.var_counts)
+        stats.clauses_by_category = dict(self.cnf_gen.clause_counts)
+        if not loaded:
+            solver.delete()
+            return None
+        if self.phase_hints:
+            started = time.perf_counter()
+            solver.set_phases(self._phase_literals(self.hint_assignment()))
+            stats.hint_time += time.perf_counter() - started
+        if self.propagator:
+            self._propagator = ConnectivityPropagator(self.cnf_gen)
+            solver.connect_propagator(self._propagator)
+            for var in self._propagator.observed_vars():
+                solver.observe(var)
+        return solver
+
+    def hint_assignment(self) -> Dict[int, int]:
+        """
+        A likely assignment, {edge id: count}: the bridges forced by island
+        capacities, extended by one backtracking-free pass of the MRV/LCV
+        heuristic of BacktrackingSolver. Not necessarily valid or connected.
+        """
+        from backtrack_solver import BacktrackingSolver
+        heuristic = BacktrackingSolver(self.game)
+        return heuristic.greedy_assignment(heuristic.forced_bridges())
+
+    def _phase_literals(self, hints: Dict[int, int]) -> List[int]:
+        """Bridge variable literals matching `hints` (edges left out: no bridge)."""
+        order = self.cnf_gen.multiplicity == 'order'
+        literals = []
+        for edge in range(self.graph.num_edges):
+            count = hints.get(edge, 0)
+            one, two = self.cnf_gen.bridge_var(edge, 1), self.cnf_gen.bridge_var(edge, 2)
+            literals.append(one if count == 1 or (order and count == 2) else -one)
+            literals.append(two if count == 2 else -two)
+        return literals
+
+    def _release_solver(self, solver: Solver):
+        for key, value in (solver.accum_stats() or {}).items():
+            self.stats.solver[key] = self.stats.solver.get(key, 0) + value
+        if self._propagator is not None:
+            self.num_cuts += self._propagator.num_clauses
+            self.stats.num_cuts += self._propagator.num_clauses
+            solver.disconnect_propagator()
+            self._propagator = None
+        solver.delete()
+
+    def _run(self, solver: Solver, assumptions: List[int] = ()) -> Optional[bool]:
+        """One SAT call; None when the conflict limit stops it."""
+        started = time.perf_counter()
+        if self.conflict_limit is None:
+            result = solver.solve(assumptions=assumptions)
+        else:
+            solver.conf_budget(self.conflict_limit)
+            result = solver.solve_limited(assumptions=assumptions)
+        self.stats.sat_time += time.perf_counter() - started
+        self.stats.sat_calls += 1
+        return result
+
+    def _stop_clock(self, start_time: float) -> float:
+        self.stats.total_time = time.perf_counter() - start_time
+        return self.stats.total_time
 
     def _is_connected(self, solution: dict) -> bool:
-        if not self.game.islands:
-            return True
-        
-        # Build graph from solution
-        graph = {}
-        for r, c, _ in self.game.islands:
-            graph[(r, c)] = []
-        
-        for (r1, c1, r2, c2), num_bridges in solution.items():
-            if num_bridges > 0:
-                graph[(r1, c1)].append((r2, c2))
-                graph[(r2, c2)].append((r1, c1))
-        
-        # BFS
-        start_island = (self.game.islands[0][0], self.game.islands[0][1])
-        visited = set()
-        queue = deque([start_island])
-        visited.add(start_island)
-        
-        while queue:
-            current = queue.popleft()
-            for neighbor in graph.get(current, []):
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append(neighbor)
-        
-        return len(visited) == len(self.game.islands)
+        return self.graph.is_connected(e for e, k in solution.items() if k > 0)
 
-    def _extract_solution(self, model, variables):
-        solution = {}
-        id_to_key = {v: k for k, v in variables.items()}
-        for val in model:
-            if val > 0:
-                key = id_to_key.get(val)
-                # Ensure it's a bridge variable (5 components)
-                if key and len(key) == 5:
-                    solution[(key[0], key[1], key[2], key[3])] = key[4]
-        return solution
+    def _extract_solution(self, model):
+        return self.cnf_gen.decode(model)
 
     def diagnose_failure(self, connectivity_failed=False):
+        """
+        Prints why the puzzle is UNSAT. Cheap checks come first (odd total,
+        islands that cannot reach their value, candidate bridges that cannot
+        connect the islands); only when none applies and find_core is set is
+        an UNSAT core minimized. The time spent counts in self.stats.
+        """
+        started = time.perf_counter()
+        self.core = None
         print("\n" + "!"*50)
         print("DIAGNOSIS REPORT")
         print("!"*50)
         
+        explained = False
         if connectivity_failed:
             print("  CONNECTIVITY FAILURE:")
             print("  - Solutions satisfying local constraints were found.")
-            print("  - HOWEVER, all found solutions were disconnected (split into groups).")
+            print("  - HOWEVER, every such solution splits the islands into groups.")
             print("  - No solution exists that connects ALL islands together.")
-            print("  - The puzzle design might be invalid.")
-            print("!"*50 + "\n")
-            return
+        else:
+            explained = self._report_local_errors()
+
+        if not self.graph.is_connected(range(self.graph.num_edges)):
+            self.core = []
+            print(" DISCONNECTED: no set of non-crossing bridges can connect all islands,")
+            print("  whatever the island values are.")
+        elif explained:
+            pass
+        elif self.find_core:
+            # Exact reason: a minimal set of islands that cannot be satisfied together
+            self.core = self.unsat_core()
+            if self.core:
+                print(f" UNSAT CORE ({len(self.core)} islands): these bridge counts cannot all"
+                      f" hold together with connectivity:")
+                for island in self.core:
+                    r, c, val = self.game.islands[island]
+                    print(f"  - Island ({r},{c}) value {val}")
+        else:
+            if not connectivity_failed:
+                print(" GLOBAL CONFLICT:")
+                print("  All local constraints seem valid, but a global contradiction exists.")
+            print("  (find_core=True / --unsat-core names the islands involved.)")
         
-        islands = self.game.islands
-        neighbors_map = self.cnf_gen.neighbors_map
-        found_reason = False
+        print("!"*50 + "\n")
+        elapsed = time.perf_counter() - started
+        self.stats.diagnose_time += elapsed
+        self.stats.total_time += elapsed
+
+    def _report_local_errors(self) -> bool:
+        """Prints the local reasons the puzzle is UNSAT; True if there is one."""
+        values = self.graph.island_values.tolist()
+        incident = self.graph.incident()
+        found = False
 
-        total_bridges = sum(val for r, c, val in islands)
+        total_bridges = sum(values)
         if total_bridges % 2 != 0:
+            found = True
             print(f" MATHEMATICAL ERROR: Total island value is {total_bridges} (Odd number).")
             print("  (Sum of bridges x 2 must be even -> Impossible to solve).")
-            found_reason = True
 
-        for r, c, val in islands:
-            neighbors = neighbors_map.get((r, c), [])
-            num_neighbors = len(neighbors)
+        for island, (r, c, val) in enumerate(self.game.islands):
+            num_neighbors = len(incident[island])
             max_possible = num_neighbors * 2
             
             if val > max_possible:
+                found = True
                 print(f" LOCAL ERROR at Island ({r},{c}) value {val}:")
                 print(f"  - Only has {num_neighbors} neighbors.")
                 print(f"  - Max possible bridges: {max_possible} (Deficit: {val - max_possible}).")
-                found_reason = True
             
             if num_neighbors == 0:
+                found = True
                 print(f" ISOLATION ERROR at Island ({r},{c}): Needs {val} bridges but has NO neighbors.")
-                found_reason = True
 
-        for r, c, val in islands:
-            neighbors = neighbors_map.get((r, c), [])
+        for island, (r, c, val) in enumerate(self.game.islands):
             max_neighbors_can_take = 0
             
-            for nr, nc in neighbors:
-                n_val = next(v for nr_, nc_, v in islands if nr_ == nr and nc_ == nc)
-                max_contribution = min(2, n_val)
+            for _, nbr in incident[island]:
+                max_contribution = min(2, values[nbr])
                 max_neighbors_can_take += max_contribution
             
             if val > max_neighbors_can_take:
+                found = True
                 print(f" NEIGHBOR CAPACITY ERROR at Island ({r},{c}) value {val}:")
                 print(f"  - Neighbors can only accept a total of {max_neighbors_can_take} bridges.")
                 print(f"  - Not enough capacity to support {val} bridges.")
-                found_reason = True
+        return found
 
-        if not found_reason:
-            print(" GLOBAL CONFLICT:")
-            print("  All local constraints seem valid, but a global contradiction exists.")
-            print("  (e.g., Mandatory crossings, or isolated sub-graphs preventing a solution).")
-        
-        print("!"*50 + "\n")
\ No newline at end of file
+    def unsat_core(self) -> Optional[List[int]]:
+        """
+        Island ids whose capacity constraints cannot all hold together with
+        connectivity, minimal by deletion: dropping any one of them makes
+        the rest satisfiable. [] when no set of non-crossing bridges can
+        connect the islands whatever their values; None if the puzzle is
+        satisfiable or a conflict limit stopped the search.
+        """
+        if not self.graph.is_connected(range(self.graph.num_edges)):
+            return []
+        saved = self.status, self.iterations, self.num_cuts, self.cnf_gen, self.stats
+        self.stats = SolveStats()
+        gen = self.cnf_gen
+        self.cnf_gen = CNFGenerator(self.game, gen.connectivity, gen.capacity, gen.multiplicity,
+                                    gen.redundant, selectors=True)
+        solver = self._load_solver()
+        try:
+            selectors = self.cnf_gen.selector_vars
+            if not self._refutes(solver, selectors):
+                return None
+            core = self._core(solver, selectors)
+            i = 0
+            while i < len(core):
+                trial = core[:i] + core[i + 1:]
+                if self._refutes(solver, trial):
+                    # The solver's core for the trial may drop even more islands
+                    core = self._core(solver, trial)
+                else:
+                    i += 1
+            island_of = {selector: island for island, selector in enumerate(selectors)}
+            return sorted(island_of[selector] for selector in core)
+        finally:
+            # Cuts learned here are valid for any subset of selectors
+            self._release_solver(solver)
+            self.status, self.iterations, self.num_cuts, self.cnf_gen, self.stats = saved
+
+    def _refutes(self, solver: Solver, assumptions: List[int]) -> bool:
+        """True iff no connected solution exists under the assumptions."""
+        return (self._solve_connected(solver, assumptions, verbose=False) is None
+                and self.status == 'UNSAT')
+
+    def _core(self, solver: Solver, assumptions: List[int]) -> List[int]:
+        core = solver.get_core()
+        if core is None:
+            return list(assumptions)
+        core = set(core)
+        return [lit for lit in assumptions if lit in core]
+
+
+class IncrementalSession:
+    """
+    A live SAT solver for a puzzle whose island values change between
+    solves, as in a puzzle editor. The formula encodes every island value
+    behind selectors (CNFGenerator all_values=True), so set_value() only
+    changes the assumptions of the next solve(); learned clauses and
+    connectivity cuts carry over, since neither depends on the values.
+    Takes the same options as PySATSolver.
+    """
+
+    def __init__(self, game: HashiwokakeroGame, connectivity: str = 'lazy',
+                 capacity: str = 'configs', multiplicity: str = 'onehot', **options):
+        self.shape = (game.rows, game.cols)
+        self.positions = [(r, c) for r, c, _ in game.islands]
+        self.values = game.graph.island_values.tolist()
+        self._index = {pos: island for island, pos in enumerate(self.positions)}
+        self.sat = PySATSolver(game, connectivity, capacity, multiplicity, **options)
+        self.sat.cnf_gen = CNFGenerator(game, connectivity, capacity, multiplicity,
+                                        self.sat.cnf_gen.redundant, all_values=True)
+        self.graph = self.sat.graph
+        self._solver = self.sat._load_solver()
+
+    @property
+    def status(self) -> Optional[str]:
+        return self.sat.status
+
+    @property
+    def game(self) -> HashiwokakeroGame:
+        """The puzzle with its current values."""
+        return HashiwokakeroGame(shape=self.shape,
+                                 islands=[(r, c, v) for (r, c), v in zip(self.positions, self.values)])
+
+    def set_value(self, row: int, col: int, value: int):
+        island = self._index.get((row, col))
+        if island is None:
+            raise ValueError(f"No island at ({row},{col})")
+        if value not in ISLAND_VALUES:
+            raise ValueError(f"Island value must be in {ISLAND_VALUES.start}-{ISLAND_VALUES.stop - 1}")
+        self.values[island] = value
+
+    def assumptions(self) -> List[int]:
+        selectors = self.sat.cnf_gen.value_selectors
+        return [selectors[island][value] for island, value in enumerate(self.values)]
+
+    def solve(self) -> Tuple[Optional[dict], float]:
+        if self._solver is None:
+            raise RuntimeError("Session is closed")
+        start_time = time.perf_counter()
+        solution = self.sat._solve_connected(self._solver, self.assumptions(), verbose=False)
+        if solution is not None:
+            solution = self.graph.to_solution(solution)
+        return solution, time.perf_counter() - start_time
+
+    def close(self):
+        if self._solver is not None:
+            self.sat._release_solver(self._solver)
+            self._solver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -5,11 +5,72 @@ import time
 from pathlib import Path
 
 # Import các modules
-from helper_01 import HashiwokakeroGame
-from helper_02 import PySATSolver
+from helper_01 import (HashiwokakeroGame, SolutionWriter, iter_corpus,
+                       load_corpus_index, write_corpus)
+from helper_02 import (CAPACITY_ENCODINGS, CONNECTIVITY_MODES, MULTIPLICITY_ENCODINGS,
+                       PROPAGATOR_BACKEND, SAT_BACKENDS, CNFGenerator, PySATSolver)
+from cnf_cache import DEFAULT_CNF_CACHE_DIR, ENCODING_OPTIONS, export_dimacs
+from solution_cache import DEFAULT_CACHE_PATH, SolutionCache
 
+SOLVER_TYPES = ['pysat', 'astar', 'backtrack', 'bruteforce']
 
-def solve_single(input_file: str, solver_type: str, output_file: str = None):
+
+def get_solver_class(solver_type: str):
+    """Import solver theo tên (các solver tìm kiếm chỉ import khi cần)."""
+    if solver_type == 'pysat':
+        return PySATSolver
+    if solver_type == 'astar':
+        from astar_solver import AStarSolver
+        return AStarSolver
+    if solver_type == 'backtrack':
+        from backtrack_solver import BacktrackingSolver
+        return BacktrackingSolver
+    if solver_type == 'bruteforce':
+        from bruteforce_solver import OptimizedBruteForceSolver
+        return OptimizedBruteForceSolver
+    raise ValueError(f"Solver không hợp lệ: {solver_type}")
+
+
+def run_solver(game: HashiwokakeroGame, solver_type: str, cache: SolutionCache = None,
+               options: dict = None):
+    """
+    Giải game, ưu tiên lấy kết quả từ cache (nếu có) trước khi tạo solver.
+    `options` là tham số riêng của PySATSolver (bỏ qua với các solver khác).
+    Trả về (solution, time_taken, stats). Khi trúng cache, time_taken là thời
+    gian tra cache, stats['cached'] là True và stats['time'] giữ thời gian giải gốc.
+    """
+    options = options if solver_type == 'pysat' and options else {}
+    # Mỗi cấu hình solver có kết quả/thống kê riêng trong cache
+    # (nơi lấy CNF và việc tìm UNSAT core không đổi kết quả nên không nằm trong key)
+    cache_key = solver_type + ''.join(f"[{k}={v}]" for k, v in sorted(options.items())
+                                      if k not in ('cnf_cache', 'find_core'))
+    if cache is not None:
+        started = time.perf_counter()
+        cached = cache.lookup(game, cache_key)
+        if cached is not None:
+            stats = dict(cached['stats'], cached=True)
+            print(f"✓ Cache hit ({solver_type}): dùng lại kết quả đã lưu.")
+            return cached['solution'], time.perf_counter() - started, stats
+
+    solver = get_solver_class(solver_type)(game, **options)
+    solution, time_taken = solver.solve()
+    stats = {'time': time_taken}
+    if hasattr(solver, 'nodes_explored'):
+        stats['nodes'] = solver.nodes_explored
+    if getattr(solver, 'status', None):
+        stats['status'] = solver.status
+    if hasattr(solver, 'stats'):
+        stats['sat_stats'] = solver.stats.as_dict()
+
+    # Chỉ lưu "không có lời giải" khi đã chứng minh UNSAT: UNKNOWN (hết giới hạn
+    # conflict) hay None của các solver tìm kiếm (hết giới hạn node) thì không
+    if cache is not None and (solution is not None or stats.get('status') == 'UNSAT'):
+        cache.store(game, cache_key, solution, stats)
+    return solution, time_taken, stats
+
+
+def solve_single(input_file: str, solver_type: str, output_file: str = None,
+                 show: bool = True, cache: SolutionCache = None, options: dict = None):
     print("="*80)
     print(f"SOLVING: {input_file}")
     print(f"SOLVER: {solver_type.upper()}")
@@ -38,29 +99,17 @@ def solve_single(input_file: str, solver_type: str, output_file: str = None):
     solution = None
     time_taken = 0
     
+    stats = {}
+    
+    if solver_type not in SOLVER_TYPES:
+        print(f"✗ Solver không hợp lệ: {solver_type}")
+        return None
+    if solver_type == 'bruteforce' and len(game.islands) > 10:
+        print("⚠ Puzzle quá lớn cho Brute Force (>10 đảo). Dùng PySAT...")
+        solver_type = 'pysat'
+    
     try:
-        if solver_type == 'pysat':
-            solver = PySATSolver(game)
-            solution, time_taken = solver.solve()
-        elif solver_type == 'astar':
-            from astar_solver import AStarSolver
-            solver = AStarSolver(game)
-            solution, time_taken = solver.solve()
-        elif solver_type == 'backtrack':
-            from backtrack_solver import BacktrackingSolver
-            solver = BacktrackingSolver(game)
-            solution, time_taken = solver.solve()
-        elif solver_type == 'bruteforce':
-            from bruteforce_solver import OptimizedBruteForceSolver
-            if len(game.islands) > 10:
-                print("⚠ Puzzle quá lớn cho Brute Force (>10 đảo). Dùng PySAT...")
-                solver = PySATSolver(game)
-            else:
-                solver = OptimizedBruteForceSolver(game)
-            solution, time_taken = solver.solve()
-        else:
-            print(f"✗ Solver không hợp lệ: {solver_type}")
-            return None
+        solution, time_taken, stats = run_solver(game, solver_type, cache, options)
     except ImportError as e:
         print(f"⚠ Solver {solver_type} chưa import được: {e}")
         return None
@@ -72,10 +121,13 @@ def solve_single(input_file: str, solver_type: str, output_file: str = None):
     
     # Xử lý kết quả
     if solution:
-        print("\n" + "="*80)
-        print("SOLUTION")
-        print("="*80)
-        game.display_solution(solution)
+        # Render một lần, dùng chung cho hiển thị và lưu file
+        board = game.render_solution(solution)
+        if show:
+            print("\n" + "="*80)
+            print("SOLUTION")
+            print("="*80)
+            game.display_solution(solution, board=board)
         
         is_valid, errors = game.validate_solution(solution)
         if is_valid:
@@ -86,74 +138,138 @@ def solve_single(input_file: str, solver_type: str, output_file: str = None):
                 print(f"  - {error}")
         
         try:
-            game.save_solution(solution, output_file)
+            game.save_solution(solution, output_file, board=board)
             print(f"\n Đã lưu solution vào: {output_file}")
         except Exception as e:
             print(f"\n Lỗi khi lưu output: {e}")
         
-        print(f"\n Thời gian: {time_taken:.4f}s")
-        if hasattr(solver, 'nodes_explored'):
-            print(f"🔍 Nodes explored: {solver.nodes_explored:,}")
+        print(f"\n Thời gian: {time_taken:.4f}s{cached_note(stats)}")
+        if 'nodes' in stats:
+            print(f"🔍 Nodes explored: {stats['nodes']:,}")
+        print_sat_stats(stats)
         
         return solution
     else:
+        unknown = stats.get('status') == 'UNKNOWN'
         print("\n" + "!"*80)
-        print("KẾT QUẢ: Map này KHÔNG CÓ LỜI GIẢI (UNSAT)")
+        if unknown:
+            print("KẾT QUẢ: CHƯA XÁC ĐỊNH (UNKNOWN - hết giới hạn conflict)")
+        else:
+            print("KẾT QUẢ: Map này KHÔNG CÓ LỜI GIẢI (UNSAT)")
         print("!"*80)
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write("NO SOLUTION\n")
-                f.write("(Map này không có lời giải)")
-            print(f"\n Đã lưu thông báo 'NO SOLUTION' vào: {output_file}")
+            write_no_solution(output_file, unknown)
+            print(f"\n Đã lưu thông báo '{'UNKNOWN' if unknown else 'NO SOLUTION'}' "
+                  f"vào: {output_file}")
         except:
             pass
-        print(f"\n Thời gian kiểm tra: {time_taken:.4f}s")
+        print(f"\n Thời gian kiểm tra: {time_taken:.4f}s{cached_note(stats)}")
+        print_sat_stats(stats)
         return None
 
 
-def benchmark_all():
+def write_no_solution(output_file, unknown: bool = False):
+    """Ghi file output khi không có lời giải (UNKNOWN nếu solver dừng khi chưa xác định)."""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        if unknown:
+            f.write("UNKNOWN\n")
+            f.write("(Hết giới hạn conflict trước khi xác định được lời giải)")
+        else:
+            f.write("NO SOLUTION\n")
+            f.write("(Map này không có lời giải)")
+
+
+def cached_note(stats: dict) -> str:
+    """Ghi chú sau thời gian khi kết quả lấy từ cache (kèm thời gian giải gốc)."""
+    if not stats.get('cached'):
+        return ''
+    return f" (tra cache; lần giải gốc: {stats.get('time', 0.0):.4f}s)"
+
+
+def print_sat_stats(stats: dict):
+    """In thời gian từng giai đoạn và kích thước CNF của PySAT (nếu có)."""
+    sat = stats.get('sat_stats')
+    if not sat:
+        return
+    print(f" Sinh CNF: {sat['generate_time']:.4f}s | Nạp solver: {sat['load_time']:.4f}s | "
+          f"SAT: {sat['sat_time']:.4f}s ({sat['sat_calls']} lần) | "
+          f"Liên thông: {sat['connectivity_time']:.4f}s"
+          + (f" | Chẩn đoán: {sat['diagnose_time']:.4f}s" if sat.get('diagnose_time') else ''))
+    clauses = ', '.join(f"{k}: {v}" for k, v in sat['clauses_by_category'].items())
+    print(f" CNF: {sat['num_vars']} biến, {sat['num_clauses']} mệnh đề ({clauses})")
+    print(f" Lặp: {sat['iterations']}, cuts: {sat['num_cuts']}, solver: "
+          + ', '.join(f"{k} {v:,}" for k, v in sat['solver'].items()))
+
+
+def benchmark_all(corpus: str = None, output_file: str = None, cache: SolutionCache = None,
+                  options: dict = None):
     print("="*80)
     print("BENCHMARK - CHẠY TẤT CẢ TEST CASES")
     print("="*80)
+    print(f"SAT backend: {(options or {}).get('backend', 'glucose3')}")
     
-    # TÌM FILE MỘT LẦN DUY NHẤT
-    files = find_input_files()
-    if not files:
-        print(" Không tìm thấy file input nào!")
-        return
+    if corpus:
+        # Corpus: đọc lần lượt từng puzzle, không nạp cả file vào bộ nhớ
+        if not os.path.exists(corpus):
+            print(f" Không tìm thấy corpus: {corpus}")
+            return
+        index = load_corpus_index(corpus)
+        total = len(index) if index is not None else None
+        entries = iter_corpus(corpus)
+        outputs_dir = None
+        # Tất cả lời giải của corpus ghi vào MỘT file (có buffer)
+        if not output_file:
+            output_file = os.path.join("Source/Outputs", f"output-{Path(corpus).stem}.txt")
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        writer = SolutionWriter(output_file)
+        print(f"Corpus: {corpus} ({total if total is not None else '?'} puzzles)\n")
+    else:
+        # TÌM FILE MỘT LẦN DUY NHẤT
+        files = find_input_files()
+        if not files:
+            print(" Không tìm thấy file input nào!")
+            return
 
-    print(f"Tìm thấy {len(files)} test cases.\n")
+        total = len(files)
+        entries = ((f.name, f) for f in files)
+        writer = None
+        print(f"Tìm thấy {len(files)} test cases.\n")
     
-    # Tạo output directory
-    outputs_dir = Path("Source/Outputs")
-    outputs_dir.mkdir(exist_ok=True)
+        # Tạo output directory
+        outputs_dir = Path("Source/Outputs")
+        outputs_dir.mkdir(exist_ok=True)
     
     results = []
     
-    # CHẠY TỪNG FILE MỘT LẦN
-    for idx, input_file in enumerate(files, 1):
+    # CHẠY TỪNG PUZZLE MỘT LẦN
+    for idx, (name, source) in enumerate(entries, 1):
         print(f"\n{'='*80}")
-        print(f"Test {idx}/{len(files)}: {input_file.name}")
+        print(f"Test {idx}/{total if total is not None else '?'}: {name}")
         print(f"{'='*80}")
         
-        output_filename = input_file.name.replace("input-", "output-")
-        output_file = outputs_dir / output_filename
+        if outputs_dir is not None:
+            output_filename = name.replace("input-", "output-")
+            output_file = outputs_dir / output_filename
         
         try:
             # Load game
-            game = HashiwokakeroGame(str(input_file))
+            if isinstance(source, HashiwokakeroGame):
+                game = source
+            else:
+                game = HashiwokakeroGame(str(source))
             print(f"Size: {game.rows}x{game.cols}, Islands: {len(game.islands)}")
             
             # Solve with PySAT
-            solver = PySATSolver(game)
-            solution, time_taken = solver.solve()
+            solution, time_taken, stats = run_solver(game, 'pysat', cache, options)
             
             # Store result
             result = {
-                'file': input_file.name,
+                'file': name,
                 'size': f"{game.rows}x{game.cols}",
                 'islands': len(game.islands),
                 'success': solution is not None,
+                'unknown': stats.get('status') == 'UNKNOWN',
+                'cached': stats.get('cached', False),
                 'time': time_taken
             }
             
@@ -166,14 +282,21 @@ def benchmark_all():
                     for err in errors[:3]:  # In 3 lỗi đầu
                         print(f"   - {err}")
                 
-                game.save_solution(solution, str(output_file))
-                print(f"✓ Đã lưu: {output_file}")
+                if writer is not None:
+                    writer.write(name, game, solution)
+                else:
+                    game.save_solution(solution, str(output_file))
+                    print(f"✓ Đã lưu: {output_file}")
             else:
                 result['valid'] = False
-                print(" KHÔNG CÓ LỜI GIẢI.")
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write("NO SOLUTION\n")
-                    f.write("(Map này không có lời giải)")
+                if result['unknown']:
+                    print(" CHƯA XÁC ĐỊNH (hết giới hạn conflict).")
+                else:
+                    print(" KHÔNG CÓ LỜI GIẢI.")
+                if writer is not None:
+                    writer.write(name, game, None, unknown=result['unknown'])
+                else:
+                    write_no_solution(output_file, result['unknown'])
             
             results.append(result)
             
@@ -183,7 +306,7 @@ def benchmark_all():
             traceback.print_exc()
             
             results.append({
-                'file': input_file.name,
+                'file': name,
                 'size': 'N/A',
                 'islands': 0,
                 'success': False,
@@ -191,17 +314,32 @@ def benchmark_all():
                 'valid': False
             })
     
+    if writer is not None:
+        writer.close()
+        print(f"\n✓ Đã lưu {writer.count} lời giải vào: {output_file}")
+
+    if not results:
+        print(" Corpus rỗng!")
+        return
+
     # In tổng kết
     print("\n" + "="*80)
-    print("TỔNG KẾT BENCHMARK")
+    print(f"TỔNG KẾT BENCHMARK (SAT backend: {(options or {}).get('backend', 'glucose3')})")
     print("="*80)
     print(f"{'File':<20} {'Size':<10} {'Islands':<10} {'Status':<12} {'Time (s)':<12} {'Valid':<8}")
     print("-"*80)
     
     for r in results:
-        status = "✓ Pass" if r['success'] else "✗ No Sol"
+        if r['success']:
+            status = "✓ Pass"
+        elif r.get('unknown'):
+            status = "? Unknown"
+        else:
+            status = "✗ No Sol"
         valid = "✓" if r.get('valid', False) else "-"
         time_str = f"{r['time']:.4f}" if r['time'] > 0 else "N/A"
+        if r.get('cached'):
+            time_str += "*"
         print(f"{r['file']:<20} {r['size']:<10} {r['islands']:<10} {status:<12} {time_str:<12} {valid:<8}")
     
     # Statistics
@@ -212,17 +350,24 @@ def benchmark_all():
     print("\n" + "="*80)
     print(f"Tổng: {total} tests")
     print(f"Có lời giải: {passed} ({passed/total*100:.1f}%)")
-    print(f"Không có lời giải: {total - passed} ({(total-passed)/total*100:.1f}%)")
+    unknown = sum(1 for r in results if r.get('unknown'))
+    print(f"Không có lời giải: {total - passed - unknown} ({(total-passed-unknown)/total*100:.1f}%)")
+    if unknown:
+        print(f"Chưa xác định (hết giới hạn conflict): {unknown}")
     print(f"Solution hợp lệ: {valid_count}/{passed}")
     
     # Tổng thời gian
     total_time = sum(r['time'] for r in results)
     print(f"Tổng thời gian: {total_time:.4f}s")
     print(f"Trung bình: {total_time/total:.4f}s/test")
+    if cache is not None:
+        print(f"Cache: {cache.hits} hit, {cache.misses} miss ({cache.path})")
+        if any(r.get('cached') for r in results):
+            print("(*) Lấy từ cache: thời gian là thời gian tra cache, không phải giải lại")
     print("="*80)
 
 
-def compare_solvers(input_file: str):
+def compare_solvers(input_file: str, cache: SolutionCache = None, options: dict = None):
     print("="*80)
     print(f"SO SÁNH SOLVERS - {Path(input_file).name}")
     print("="*80)
@@ -262,7 +407,7 @@ def compare_solvers(input_file: str):
     results = {}
     pysat_unsat = False  
 
-    for name, SolverClass in solvers:
+    for name, _ in solvers:
         # Nếu PySAT đã xác định UNSAT thì bỏ qua các thuật toán còn lại
         if pysat_unsat:
             print(f"\n {name.upper()}: SKIPPED (Do PySAT xác định UNSAT)")
@@ -276,8 +421,7 @@ def compare_solvers(input_file: str):
 
         print(f"\n--- Testing {name.upper()} ---")
         try:
-            solver = SolverClass(game)
-            solution, time_taken = solver.solve()
+            solution, time_taken, stats = run_solver(game, name, cache, options)
             
             is_valid = False
             if solution:
@@ -289,12 +433,19 @@ def compare_solvers(input_file: str):
             
             results[name] = {
                 'success': solution is not None,
+                'unknown': stats.get('status') == 'UNKNOWN',
+                'cached': stats.get('cached', False),
                 'time': time_taken,
+                # Speedup so theo thời gian giải, kể cả khi kết quả lấy từ cache
+                'solve_time': stats.get('time', time_taken),
                 'valid': is_valid,
-                'nodes': getattr(solver, 'nodes_explored', 0)
+                'nodes': stats.get('nodes', 0)
             }
             
-            if not solution:
+            if not solution and results[name]['unknown']:
+                # Hết giới hạn conflict: chưa biết có lời giải hay không, vẫn chạy tiếp
+                print(f"➤ {name.upper()}: CHƯA XÁC ĐỊNH (UNKNOWN - hết giới hạn conflict).")
+            elif not solution:
                 print(f"➤ {name.upper()}: KHÔNG CÓ LỜI GIẢI.")
                 # Logic mới thêm vào ở đây:
                 if name == 'pysat':
@@ -320,13 +471,15 @@ def compare_solvers(input_file: str):
     print(f"{'Solver':<15} {'Status':<12} {'Valid':<8} {'Time (s)':<12} {'Nodes':<15} {'Speedup':<10}")
     print("-"*80)
     
-    base_time = results.get('pysat', {}).get('time', 1)
+    base_time = results.get('pysat', {}).get('solve_time', 1)
     if base_time == 0:
         base_time = 0.0001  
     
     for name, res in results.items():
         if res.get('success'):
             status = "✓ Pass"
+        elif res.get('unknown'):
+            status = "? Unknown"
         else:
             # Phân biệt giữa không giải được và bị Skip
             if name != 'pysat' and pysat_unsat and res['time'] == 0:
@@ -336,15 +489,19 @@ def compare_solvers(input_file: str):
 
         valid = "✓" if res['valid'] else "-"
         time_str = f"{res['time']:.4f}" if res['time'] > 0 else "0.0000"
+        if res.get('cached'):
+            time_str += "*"
         nodes_str = f"{res['nodes']:,}" if res['nodes'] > 0 else "-"
         
-        if res['time'] > 0:
-            speedup = f"{base_time/res['time']:.2f}x"
+        if res.get('solve_time', 0) > 0:
+            speedup = f"{base_time/res['solve_time']:.2f}x"
         else:
             speedup = "-"
         
         print(f"{name.upper():<15} {status:<12} {valid:<8} {time_str:<12} {nodes_str:<15} {speedup:<10}")
     
+    if any(res.get('cached') for res in results.values()):
+        print("(*) Lấy từ cache: thời gian là thời gian tra cache; speedup tính theo lần giải gốc")
     print("="*80)
 
 
@@ -371,6 +528,49 @@ def find_input_files():
     return []
 
 
+def make_corpus(corpus: str):
+    """Gom tất cả file input-*.txt thành một file corpus JSONL (kèm index)."""
+    files = find_input_files()
+    if not files:
+        print(" Không tìm thấy file input nào!")
+        return
+    count = write_corpus(corpus, ((f.name, HashiwokakeroGame(str(f))) for f in files))
+    print(f" Đã ghi {count} puzzles vào corpus: {corpus}")
+
+
+def export_cnf(input_file: str, path: str, options: dict = None):
+    """Ghi CNF của puzzle ra file DIMACS (kèm sidecar <path>.json)."""
+    options = options or {}
+    game = HashiwokakeroGame(input_file)
+    cnf_gen = CNFGenerator(game, **{k: options[k] for k in ENCODING_OPTIONS if k in options})
+    export_dimacs(cnf_gen, path)
+    print(f" Đã ghi CNF ({cnf_gen.var_counter - 1} biến, {cnf_gen.num_clauses} mệnh đề) "
+          f"vào: {path}")
+
+
+def replay_cnf(path: str, options: dict = None, show: bool = True):
+    """Giải lại một CNF đã export bằng PySATSolver (encoding lấy từ sidecar)."""
+    options = options or {}
+    solver_options = {k: v for k, v in options.items()
+                      if k in ('backend', 'conflict_limit', 'incremental', 'propagator',
+                               'phase_hints', 'find_core')}
+    solver = PySATSolver.from_dimacs(path, **solver_options)
+    game = solver.game
+    print(f"REPLAY: {path} ({game.rows}x{game.cols}, {len(game.islands)} đảo)")
+    solution, time_taken = solver.solve()
+    if solution:
+        if show:
+            game.display_solution(solution)
+        is_valid, _ = game.validate_solution(solution)
+        print(f"\n Solution {'hợp lệ' if is_valid else 'không hợp lệ'}!")
+    elif solver.status == 'UNKNOWN':
+        print("\n KẾT QUẢ: UNKNOWN (hết giới hạn conflict)")
+    else:
+        print("\n KẾT QUẢ: KHÔNG CÓ LỜI GIẢI (UNSAT)")
+    print(f" Thời gian: {time_taken:.4f}s")
+    return solution
+
+
 def select_file_menu():
     files = find_input_files()
     if not files:
@@ -421,7 +621,7 @@ def select_solver_menu():
         print("Lựa chọn không hợp lệ.")
 
 
-def interactive_mode():
+def interactive_mode(cache: SolutionCache = None, options: dict = None):
     while True:
         print("\n" + "="*50)
         print("   HASHIWOKAKERO SOLVER - MENU CHÍNH")
@@ -439,17 +639,17 @@ def interactive_mode():
                 f = select_file_menu()
                 if f:
                     s = select_solver_menu()
-                    solve_single(f, s)
+                    solve_single(f, s, cache=cache, options=options)
                     input("\nẤn Enter để tiếp tục...")
                     
             elif choice == '2':  # Benchmark
-                benchmark_all()
+                benchmark_all(cache=cache, options=options)
                 input("\nẤn Enter để tiếp tục...")
                 
             elif choice == '3':  # Compare
                 f = select_file_menu()
                 if f:
-                    compare_solvers(f)
+                    compare_solvers(f, cache=cache, options=options)
                     input("\nẤn Enter để tiếp tục...")
                     
             elif choice == '4':  # Exit
@@ -474,14 +674,24 @@ Examples:
   python main.py                                    # Interactive mode
   python main.py -i                                 # Interactive mode
   python main.py --benchmark                        # Run all tests
+  python main.py --make-corpus corpus.jsonl         # Pack inputs into a corpus
+  python main.py --benchmark --corpus corpus.jsonl  # Benchmark a corpus
   python main.py --input input-01.txt               # Solve with PySAT
   python main.py --input input-01.txt --solver astar  # Solve with A*
   python main.py --compare --input input-01.txt     # Compare all solvers
+  python main.py --benchmark --cache                # Reuse cached results
+  python main.py --benchmark --connectivity tree    # Connectivity encoded in CNF
+  python main.py --benchmark --capacity seqcounter  # Cardinality capacity encoding
+  python main.py --benchmark --sat-backend cadical195  # Another SAT solver
+  python main.py --benchmark --propagator           # CaDiCaL connectivity propagator
+  python main.py --benchmark --cnf-cache            # Reuse generated CNFs
+  python main.py --input input-01.txt --export-cnf p.cnf  # Write DIMACS + p.cnf.json
+  python main.py --replay-cnf p.cnf                 # Solve an exported CNF
         """
     )
     
     parser.add_argument('--solver', default='pysat',
-                        choices=['pysat', 'astar', 'backtrack', 'bruteforce'],
+                        choices=SOLVER_TYPES,
                         help='Solver algorithm to use (default: pysat)')
     parser.add_argument('--input', type=str,
                         help='Input file path')
@@ -491,25 +701,85 @@ Examples:
                         help='Run benchmark on all test cases')
     parser.add_argument('--compare', action='store_true',
                         help='Compare all solvers on given input')
+    parser.add_argument('--corpus', type=str,
+                        help='JSONL corpus file to benchmark instead of input-*.txt files')
+    parser.add_argument('--make-corpus', type=str, metavar='FILE',
+                        help='Pack all input-*.txt files into a JSONL corpus file')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help='Do not print the solution board')
+    parser.add_argument('--connectivity', default='lazy', choices=CONNECTIVITY_MODES,
+                        help='PySAT connectivity: lazy cut refinement or spanning-tree '
+                             'encoding in the CNF (default: lazy)')
+    parser.add_argument('--capacity', default='configs', choices=CAPACITY_ENCODINGS,
+                        help='PySAT island capacity encoding: neighbor configurations '
+                             'or a cardinality/PB encoding (default: configs)')
+    parser.add_argument('--multiplicity', default='onehot', choices=MULTIPLICITY_ENCODINGS,
+                        help='PySAT bridge count variables: one-hot k=1/k=2 or order '
+                             'x>=1/x>=2 (default: onehot)')
+    parser.add_argument('--sat-backend', choices=SAT_BACKENDS,
+                        help=f'SAT solver used by PySAT (default: glucose3, '
+                             f'or {PROPAGATOR_BACKEND} with --propagator)')
+    parser.add_argument('--conflict-limit', type=int, metavar='N',
+                        help='PySAT: max conflicts per SAT call, then report UNKNOWN')
+    parser.add_argument('--incremental', action='store_true',
+                        help='PySAT: incremental mode of the backend (glucose/gluecard/mergesat)')
+    parser.add_argument('--propagator', action='store_true',
+                        help=f'PySAT: check connectivity during search with an external '
+                             f'propagator ({PROPAGATOR_BACKEND} only)')
+    parser.add_argument('--redundant', action='store_true',
+                        help='PySAT: add implied clauses (no closed 1-1 / 2=2 pairs, '
+                             'forced bridges on saturated islands)')
+    parser.add_argument('--phase-hints', action='store_true',
+                        help='PySAT: prefer the phases of forced bridges and a greedy '
+                             'backtracking pass (not with cadical103)')
+    parser.add_argument('--unsat-core', action='store_true',
+                        help='PySAT: when an UNSAT puzzle has no simple cause, find a minimal '
+                             'set of conflicting islands (one extra solve per island)')
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_PATH, metavar='PATH',
+                        help=f'Cache solver results in SQLite (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--cache-size', type=int, default=100000, metavar='N',
+                        help='Max cached results before LRU eviction (default: 100000)')
+    parser.add_argument('--cnf-cache', nargs='?', const=DEFAULT_CNF_CACHE_DIR, metavar='DIR',
+                        help=f'PySAT: store generated CNFs as DIMACS and reuse them '
+                             f'(default: {DEFAULT_CNF_CACHE_DIR})')
+    parser.add_argument('--export-cnf', type=str, metavar='FILE',
+                        help='Write the CNF of --input as DIMACS, plus a FILE.json sidecar')
+    parser.add_argument('--replay-cnf', type=str, metavar='FILE',
+                        help='Solve a CNF written by --export-cnf')
     parser.add_argument('--interactive', '-i', action='store_true',
                         help='Interactive mode with menu')
     
     args = parser.parse_args()
     
     os.makedirs("Source/Outputs", exist_ok=True)
+    cache = SolutionCache(args.cache, args.cache_size) if args.cache else None
+    backend = args.sat_backend or (PROPAGATOR_BACKEND if args.propagator else 'glucose3')
+    options = {'connectivity': args.connectivity, 'capacity': args.capacity,
+               'multiplicity': args.multiplicity, 'backend': backend,
+               'conflict_limit': args.conflict_limit, 'incremental': args.incremental,
+               'propagator': args.propagator, 'redundant': args.redundant,
+               'phase_hints': args.phase_hints, 'cnf_cache': args.cnf_cache,
+               'find_core': args.unsat_core}
     
     try:
         if args.interactive:
-            interactive_mode()
-        elif args.benchmark:
-            benchmark_all()
+            interactive_mode(cache, options)
+        elif args.make_corpus:
+            make_corpus(args.make_corpus)
+        elif args.export_cnf and args.input:
+            export_cnf(args.input, args.export_cnf, options)
+        elif args.replay_cnf:
+            replay_cnf(args.replay_cnf, options, show=not args.quiet)
+        elif args.benchmark or args.corpus:
+            benchmark_all(args.corpus, args.output, cache, options)
         elif args.compare and args.input:
-            compare_solvers(args.input)
+            compare_solvers(args.input, cache, options)
         elif args.input:
-            solve_single(args.input, args.solver, args.output)
+            solve_single(args.input, args.solver, args.output, show=not args.quiet,
+                         cache=cache, options=options)
         else:
             print(" Tip: Dùng -h để xem các options")
-            interactive_mode()
+            interactive_mode(cache, options)
     except KeyboardInterrupt:
         print("\n\nĐã dừng chương trình.")
         sys.exit(0)
@@ -518,6 +788,9 @@ Examples:
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+
+from helper_01 import HashiwokakeroGame
+
+DEFAULT_CACHE_PATH = os.path.join("Source", ".cache", "solutions.sqlite")
+
+
+class SolutionCache:
+    """
+    On-disk cache of solver results keyed by (canonical puzzle hash, solver).
+
+    Solutions are stored in the canonical orientation of the puzzle, so a
+    rotated or mirrored copy of a solved puzzle is a cache hit too. A puzzle
+    with no solution is stored with NULL bridges. Once the cache holds more
+    than `max_entries` results, the least recently used ones are evicted.
+    """
+
+    COMMIT_EVERY = 256
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 100000):
+        if max_entries < 1:
+            raise ValueError("max_entries phải >= 1")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS solutions ("
+            " puzzle_hash TEXT NOT NULL,"
+            " solver TEXT NOT NULL,"
+            " bridges TEXT,"
+            " stats TEXT NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (puzzle_hash, solver))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def lookup(self, game: HashiwokakeroGame, solver: str) -> Optional[Dict]:
+        """
+        Cached result for the puzzle as {'solution': dict or None, 'stats': dict},
+        with the solution mapped onto the puzzle's own orientation. None on a miss.
+        """
+        puzzle_hash, symmetry = self._key(game)
+        row = self._conn.execute(
+            "SELECT bridges, stats FROM solutions WHERE puzzle_hash = ? AND solver = ?",
+            (puzzle_hash, solver),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._conn.execute(
+            "UPDATE solutions SET last_used = ? WHERE puzzle_hash = ? AND solver = ?",
+            (time.time(), puzzle_hash, solver),
+        )
+        self._touch()
+
+        bridges, stats = row
+        solution = None
+        if bridges is not None:
+            canonical = {tuple(bridge[:4]): bridge[4] for bridge in json.loads(bridges)}
+            solution = game.solution_from_canonical(canonical, symmetry)
+        return {'solution': solution, 'stats': json.loads(stats)}
+
+    def store(self, game: HashiwokakeroGame, solver: str, solution: Optional[dict],
+              stats: Optional[dict] = None):
+        """Records a solver result (solution None means no solution)."""
+        puzzle_hash, symmetry = self._key(game)
+        bridges = None
+        if solution is not None:
+            canonical = game.solution_to_canonical(solution, symmetry)
+            bridges = json.dumps([[*key, count] for key, count in sorted(canonical.items())])
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO solutions (puzzle_hash, solver, bridges, stats, last_used)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (puzzle_hash, solver, bridges, json.dumps(stats or {}), time.time()),
+        )
+        # Overwrites make the running count an upper bound; recount before evicting
+        self._count += 1
+        if self._count > self.max_entries:
+            self._count = self._conn.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+            self._evict()
+        self._touch()
+
+    def clear(self):
+        self._conn.execute("DELETE FROM solutions")
+        self._conn.commit()
+        self._count = 0
+        self._pending = 0
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _key(self, game: HashiwokakeroGame):
+        # Same digest as game.content_hash(), without canonicalizing twice
+        data, symmetry = game.canonical_form()
+        return hashlib.sha256(data).hexdigest(), symmetry
+
+    def _evict(self):
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM solutions WHERE rowid IN"
+            " (SELECT rowid FROM solutions ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._count -= excess
+
+    def _touch(self):
+        # Batch commits: a benchmark over a large corpus should not fsync per puzzle
+        self._pending += 1
+        if self._pending >= self.COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0